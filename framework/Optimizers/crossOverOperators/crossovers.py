@@ -38,25 +38,19 @@ def onePointCrossover(parents,**kwargs):
     @ Out, children, np.array, children resulting from the crossover. Shape is nParents x len(chromosome) i.e, number of Genes/Vars
   """
   nParents,nGenes = np.shape(parents)
-  # Number of children = 2* (nParents choose 2)
-  children = xr.DataArray(np.zeros((int(2*comb(nParents,2)),nGenes)),
-                          dims=['chromosome','Gene'],
-                          coords={'chromosome': np.arange(int(2*comb(nParents,2))),
-                                  'Gene':kwargs['variables']})
-
-
   # defaults
   if (kwargs['crossoverProb'] == None) or ('crossoverProb' not in kwargs.keys()):
     crossoverProb = randomUtils.random(dim=1, samples=1)
   else:
     crossoverProb = kwargs['crossoverProb']
 
-  # create children
-  parentsPairs = list(combinations(parents,2))
-
-  for ind,parent in enumerate(parentsPairs):
-    parent = np.array(parent).reshape(2,-1) # two parents at a time
-
+  # the crossover works on the plain values, the children DataArray is built once at the end
+  parentsValues = np.asarray(parents)
+  parentsPairs = np.array(list(combinations(range(nParents),2)), dtype=int).reshape(-1,2)
+  nPairs = len(parentsPairs)
+  # crossover location of each pair of parents (nGenes if the children are just copies of the parents)
+  points = np.full(nPairs, nGenes, dtype=int)
+  for ind in range(nPairs):
     if randomUtils.random(dim=1,samples=1) <= crossoverProb:
       if (kwargs['points'] == None) or ('points' not in kwargs.keys()):
         point = list([randomUtils.randomIntegers(1,nGenes-1,None)])
@@ -64,13 +58,25 @@ def onePointCrossover(parents,**kwargs):
         raise ValueError('Crossover point cannot be larger than number of Genes (variables)')
       else:
         point = kwargs['points']
-      for i in range(nGenes):
-        if len(point)>1:
-          raise ValueError('In one Point Crossover a single crossover location should be provided!')
-        children[2*ind:2*ind+2,i] = parent[np.arange(0,2)*(i<point[0])+np.arange(-1,-3,-1)*(i>=point[0]),i]
-    else:
-      # Each child is just a copy of the parents
-      children[2*ind:2*ind+2,:] = parent
+      if len(point)>1:
+        raise ValueError('In one Point Crossover a single crossover location should be provided!')
+      points[ind] = point[0]
+
+  # the first child takes the genes of the first parent before the crossover location and the ones of the second parent after it
+  parent1 = parentsValues[parentsPairs[:,0]]
+  parent2 = parentsValues[parentsPairs[:,1]]
+  beforePoint = np.arange(nGenes)[np.newaxis,:] < points[:,np.newaxis]
+  # Number of children = 2* (nParents choose 2)
+  # the children are filled in place, without temporary arrays
+  childrenValues = np.empty((2*nPairs,nGenes))
+  np.copyto(childrenValues[0::2], parent2)
+  np.copyto(childrenValues[0::2], parent1, where=beforePoint)
+  np.copyto(childrenValues[1::2], parent1)
+  np.copyto(childrenValues[1::2], parent2, where=beforePoint)
+  children = xr.DataArray(childrenValues,
+                          dims=['chromosome','Gene'],
+                          coords={'chromosome': np.arange(2*nPairs),
+                                  'Gene':kwargs['variables']})
 
   return children
 
@@ -20,20 +20,105 @@
   Dynamic Mode Decomposition with Control (The class is based on the DynamicModeDecomposition class)
 """
 #External Modules------------------------------------------------------------------------------------
-import sys
+import io
+import os
+import functools
+from concurrent import futures
 import numpy as np
 import scipy
-from sklearn import neighbors
 from scipy import spatial
-import matplotlib.pyplot as plt
 #External Modules End--------------------------------------------------------------------------------
 
 #Internal Modules------------------------------------------------------------------------------------
 from utils import mathUtils
+from utils import importerUtils as im
 from utils import InputData, InputTypes
 from .DynamicModeDecomposition import DMD
 #Internal Modules End--------------------------------------------------------------------------------
 
+def _propagateLoops(A, B, U, outX):
+  """
+    Propagate the DMDC state equation X[k+1] = A*X[k] + B*U[k] with explicit loops
+    for a group of requests sharing the same A and B (this is the kernel compiled by numba, when available)
+    @ In, A, np.ndarray, shape (n_states, n_states), the state matrix
+    @ In, B, np.ndarray, shape (n_states, n_actuators), the actuator matrix
+    @ In, U, np.ndarray, shape (n_requests, n_timesteps, n_actuators), the actuator signals
+    @ In, outX, np.ndarray, shape (n_requests, n_timesteps, n_states), the states (outX[:, 0] are the initial states)
+    @ Out, None (outX is filled in place)
+  """
+  nStates, nActuators = B.shape
+  for g in range(outX.shape[0]):
+    for i in range(1, outX.shape[1]):
+      for r in range(nStates):
+        acc = 0.
+        for c in range(nStates):
+          acc += A[r, c] * outX[g, i-1, c]
+        for c in range(nActuators):
+          acc += B[r, c] * U[g, i-1, c]
+        outX[g, i, r] = acc
+
+def _propagateNumpy(A, B, U, outX):
+  """
+    Propagate the DMDC state equation X[k+1] = A*X[k] + B*U[k] with numpy
+    for a group of requests sharing the same A and B (fallback when numba is not available).
+    Each time step is a single matrix-matrix product over the whole group.
+    @ In, A, np.ndarray, shape (n_states, n_states), the state matrix
+    @ In, B, np.ndarray, shape (n_states, n_actuators), the actuator matrix
+    @ In, U, np.ndarray, shape (n_requests, n_timesteps, n_actuators), the actuator signals
+    @ In, outX, np.ndarray, shape (n_requests, n_timesteps, n_states), the states (outX[:, 0] are the initial states)
+    @ Out, None (outX is filled in place)
+  """
+  AT, BT = A.T, B.T
+  for i in range(outX.shape[1]-1):
+    outX[:, i+1] = outX[:, i].dot(AT) + U[:, i].dot(BT)
+
+def _formatRows(values, fmt='%.8e'):
+  """
+    Format a stack of arrays as space-separated strings, one for each entry of the first axis.
+    The rows are streamed through numpy.savetxt into an in-memory buffer (no list of per-entry strings is built)
+    @ In, values, np.ndarray, the values to format, shape (n_rows, ...) (each row is flattened in C order)
+    @ In, fmt, str, optional, the format of each entry
+    @ Out, _formatRows, list, the formatted rows
+  """
+  buf = io.StringIO()
+  np.savetxt(buf, np.reshape(values, (len(values), -1)), fmt=fmt, delimiter=' ')
+  return buf.getvalue().splitlines()
+
+def _formatVector(values, fmt='%.8e'):
+  """
+    Format the entries of an array as a space-separated string
+    @ In, values, np.ndarray, the values to format (flattened in C order)
+    @ In, fmt, str, optional, the format of each entry
+    @ Out, _formatVector, str, the formatted values
+  """
+  return _formatRows(np.reshape(values, (1, -1)), fmt)[0]
+
+def _mapSamples(func, *stacks):
+  """
+    Apply a function to each sample of a stack of arrays, dispatching the samples to a pool of threads
+    (the numpy/scipy LAPACK routines release the GIL, so the samples are processed concurrently)
+    @ In, func, callable, the function to apply
+    @ In, stacks, tuple(np.ndarray), the arrays whose first axis is the sample axis
+    @ Out, _mapSamples, list, the results of func for each sample
+  """
+  nSamples = len(stacks[0])
+  if nSamples < 2:
+    return [func(*args) for args in zip(*stacks)]
+  with futures.ThreadPoolExecutor(max_workers=min(nSamples, os.cpu_count() or 1)) as executor:
+    return list(executor.map(func, *stacks))
+
+@functools.lru_cache(maxsize=None)
+def _propagationKernel():
+  """
+    Get the DMDC propagation kernel, compiled by numba when available (at the first request only, not at import)
+    @ In, None
+    @ Out, kernel, function, the propagation kernel
+  """
+  if im.isLibAvail("numba"):
+    from numba import njit
+    return njit(cache=True, fastmath=True)(_propagateLoops)
+  return _propagateNumpy
+
 class DMDC(DMD):
   """
     This surrogate is aimed to construct a "time-dep" surrogate based on
@@ -127,6 +212,17 @@ class DMDC(DMD):
                                                  descr=r"""True if the initial values need to be subtracted from the
                                                  actuators (u), state (x) and outputs (y) if any. False if the subtraction
                                                  is not needed.""", default=False))
+    specs.addSub(InputData.parameterInputFactory("matrixDtype", contentType=InputTypes.makeEnumType("matrixDtype", "matrixDtypeType", ["float64", "float32"]),
+                                                 descr=r"""the floating point precision used to store the A, B and C matrices
+                                                 and to propagate the system in the evaluation stage. Single precision
+                                                 (\xmlString{float32}) halves the memory traffic of the evaluation, at the cost
+                                                 of the accuracy of the predictions.""", default="float64"))
+    specs.addSub(InputData.parameterInputFactory("device", contentType=InputTypes.makeEnumType("device", "deviceType", ["cpu", "cuda"]),
+                                                 descr=r"""the device used to propagate the system in the evaluation stage.
+                                                 If \xmlString{cuda}, the propagation is performed on the GPU through the
+                                                 CuPy library (worth it for a large number of requests and time steps).
+                                                 If CuPy is not available, the evaluation falls back to the
+                                                 \xmlString{cpu}.""", default="cpu"))
     return specs
 
   def __init__(self):
@@ -152,7 +248,7 @@ class DMDC(DMD):
     """
     super()._handleInput(paramInput)
     settings, notFound = paramInput.findNodesAndExtractValues(['actuators','stateVariables', 'initStateVariables',
-                                                               'subtractNormUXY'])
+                                                               'subtractNormUXY', 'matrixDtype', 'device'])
     # notFound must be empty
     assert(not notFound)
     ### Extract the Actuator Variable Names (u)
@@ -164,6 +260,13 @@ class DMDC(DMD):
     self.initStateID = settings.get('initStateVariables')
     # whether to subtract the nominal(initial) value from U, X and Y signal for calculation
     self.dmdParams['centerUXY'] = settings.get('subtractNormUXY')
+    # the precision of the A, B and C matrices (and of the propagation)
+    self.dmdParams['matrixDtype'] = settings.get('matrixDtype')
+    # the device for the propagation in the evaluation stage
+    self.dmdParams['device'] = settings.get('device')
+    if self.dmdParams['device'] == 'cuda' and not im.isLibAvail("cupy"):
+      self.raiseAWarning('The device "cuda" requires the CuPy library, which is not available. The evaluation will be performed on the cpu!')
+      self.dmdParams['device'] = 'cpu'
     # some checks
     # check if state ids in target
     if not (set(self.stateID) <= set(self.target)):
@@ -176,6 +279,37 @@ class DMDC(DMD):
     self.outputID = [x for x in self.target if x not in (set(self.stateID) | set([self.pivotParameterID]))]
     # check if there are parameters
     self.parametersIDs = list(set(self.features) - set(self.actuatorsID) - set(self.initStateID))
+    # positions of the variables among the features and targets (to avoid repeated list lookups)
+    self._featIdx = {var: i for i, var in enumerate(self.features)}
+    self._targIdx = {var: i for i, var in enumerate(self.target)}
+
+  def __setstate__(self, state):
+    """
+      Initializes the DMDC with the data contained in state.
+      The states pickled by the previous versions (snapshots stored as [n_timesteps, n_samples, n_variables]
+      and nearest sample found by a KNeighborsRegressor "neigh") are converted to the current layout
+      @ In, state, dict, it contains all the information needed by the ROM to be initialized
+      @ Out, None
+    """
+    # the DMD kd-tree of the training features is not used by the DMDC (the DMDC has its own)
+    super(DMD, self).__setstate__(state)
+    if 'neigh' in state:
+      del self.neigh
+      if self.stateVals is not None:
+        nSamples, nTs = len(self._DMDC__Atilde), len(self.pivotValues)
+        for name in ['actuatorVals', 'stateVals', 'outputVals']:
+          values = np.asarray(getattr(self, name))
+          # without outputs, the previous versions stored an empty array
+          values = values.transpose(1, 0, 2) if values.ndim == 3 else np.zeros((nSamples, nTs, 0))
+          setattr(self, name, np.ascontiguousarray(values))
+        self.KDTreeFinder = spatial.cKDTree(self.parameterValues) if len(self.parametersIDs) else None
+        # the previous versions shared the same dictionary between the 'training' and 'dmd' time scales
+        self.timeScales = {key: dict(timeScale) for key, timeScale in self.timeScales.items()}
+    # settings added after the previous versions
+    self.dmdParams.setdefault('matrixDtype', 'float64')
+    self.dmdParams.setdefault('device', 'cpu')
+    self._featIdx = {var: i for i, var in enumerate(self.features)}
+    self._targIdx = {var: i for i, var in enumerate(self.target)}
 
   def __trainLocal__(self,featureVals,targetVals):
     """
@@ -184,35 +318,43 @@ class DMDC(DMD):
       @ In, targetVals, numpy.ndarray, shape = [n_samples,n_timeStep, n_dimensions], an array of time series data
     """
     ### Extract the Pivot Values (Actuator, U) ###
-    self.neigh = None
+    self.KDTreeFinder = None
     if len(self.parametersIDs):
-      self.parameterValues =  np.asarray([featureVals[:, :, self.features.index(par)] for par in self.parametersIDs]).T[0, :, :]
-      self.neigh = neighbors.KNeighborsRegressor(n_neighbors=1)
-      y = np.asarray (range(featureVals.shape[0]))
-      self.neigh.fit(self.parameterValues, y)
+      # the scheduling parameters are constant in time, shape is [n_samples, n_parameters]
+      self.parameterValues = featureVals[:, 0, [self._featIdx[par] for par in self.parametersIDs]]
+      # the nearest training sample is looked up directly in a kd-tree of the parameter values
+      self.KDTreeFinder = spatial.cKDTree(self.parameterValues)
     # self.ActuatorVals is Num_Entries*2 array, the snapshots of [u1, u2]. Shape is [n_samples, n_timesteps, n_actuators]
-    self.actuatorVals = np.asarray([featureVals[:, :, self.features.index(act)] for act in self.actuatorsID]).T
+    self.actuatorVals = featureVals[:, :, [self._featIdx[act] for act in self.actuatorsID]]
     ### Extract the time marks "self.pivotValues" (discrete, in time step marks) ###
     ### the pivotValues must be all the same
-    self.pivotValues = targetVals[0, :, self.target.index(self.pivotParameterID)].flatten()
+    self.pivotValues = targetVals[0, :, self._targIdx[self.pivotParameterID]].flatten()
     # self.outputVals is Num_Entries*2 array, the snapshots of [y1, y2]. Shape is [n_samples, n_timesteps, n_targets]
-    self.outputVals =  np.asarray([targetVals[:, :,self.target.index(out)] for out in self.outputID]).T
+    self.outputVals = targetVals[:, :, [self._targIdx[out] for out in self.outputID]]
     ### Extract the State Values (State, X) ###
-    # self.outputVals is Num_Entries*2 array, the snapshots of [y1, y2]. Shape is [n_samples, n_timesteps, n_state_variables]
-    self.stateVals =  np.asarray([targetVals[:, :, self.target.index(st)] for st in self.stateID]).T
-    # create matrices
-    self.__Atilde = np.zeros((featureVals.shape[0], len(self.stateID), len(self.stateID)))
-    self.__Btilde = np.zeros((featureVals.shape[0], len(self.stateID), len(self.actuatorsID)))
-    self.__Ctilde = np.zeros((featureVals.shape[0], len(self.outputID), len(self.stateID)))
-    for smp in range(featureVals.shape[0]):
-      X1 = (self.stateVals[:-1,smp,:]    - self.stateVals[0,smp,:]).T    if self.dmdParams['centerUXY'] else self.stateVals[:-1,smp,:].T
-      X2 = (self.stateVals[1:,smp,:]     - self.stateVals[0,smp,:]).T    if self.dmdParams['centerUXY'] else self.stateVals[1:,smp,:].T
-      U =  (self.actuatorVals[:-1,smp,:] - self.actuatorVals[0,smp,:]).T if self.dmdParams['centerUXY'] else self.actuatorVals[:-1,smp,:].T
-      Y1 = (self.outputVals[:-1,smp,:]   - self.outputVals[0,smp,:]).T   if self.dmdParams['centerUXY'] else self.outputVals[:-1,smp,:].T
-      # compute A,B,C matrices
-      self.__Atilde[smp,:,:] , self.__Btilde[smp,:,:], self.__Ctilde[smp,:,:] = self._evaluateMatrices(X1, X2, U, Y1, self.dmdParams['rankSVD'])
+    # self.stateVals is Num_Entries*2 array, the snapshots of [x1, x2]. Shape is [n_samples, n_timesteps, n_state_variables]
+    self.stateVals = targetVals[:, :, [self._targIdx[st] for st in self.stateID]]
+    # Centralize U, X and Y when required (the nominal values are the initial ones of each sample)
+    if self.dmdParams['centerUXY']:
+      stateVals    = self.stateVals    - self.stateVals[:, 0:1]
+      actuatorVals = self.actuatorVals - self.actuatorVals[:, 0:1]
+      outputVals   = self.outputVals   - self.outputVals[:, 0:1]
+    else:
+      stateVals, actuatorVals, outputVals = self.stateVals, self.actuatorVals, self.outputVals
+    # stack the snapshots of all the samples: shape is [n_samples, n_variables, n_timesteps-1]
+    X1 = stateVals[:, :-1].transpose(0, 2, 1)
+    X2 = stateVals[:, 1:].transpose(0, 2, 1)
+    U  = actuatorVals[:, :-1].transpose(0, 2, 1)
+    Y1 = outputVals[:, :-1].transpose(0, 2, 1)
+    # compute A,B,C matrices of all the samples at once
+    A, B, C = self._evaluateMatricesBatch(X1, X2, U, Y1, self.dmdParams['rankSVD'])
+    dtype = np.dtype(self.dmdParams['matrixDtype'])
+    self.__Atilde, self.__Btilde, self.__Ctilde = (np.ascontiguousarray(M, dtype=dtype) for M in (A, B, C))
     # Default timesteps (even if the time history is not equally spaced in time, we "trick" the dmd to think it).
-    self.timeScales = dict.fromkeys( ['training','dmd'],{'t0': self.pivotValues[0], 'intervals': len(self.pivotValues[:]) - 1, 'dt': self.pivotValues[1]-self.pivotValues[0]})
+    timeScale = {'t0': float(self.pivotValues[0]), 'intervals': self.pivotValues.size - 1, 'dt': float(self.pivotValues[1] - self.pivotValues[0])}
+    if not np.allclose(np.diff(self.pivotValues), timeScale['dt']):
+      self.raiseAWarning('The pivot parameter "{}" is not equally spaced: the DMDC assumes a constant time step of {}'.format(self.pivotParameterID, timeScale['dt']))
+    self.timeScales = {'training': timeScale, 'dmd': dict(timeScale)}
 
   #######
   def __evaluateLocal__(self,featureVals):
@@ -223,58 +365,76 @@ class DMDC(DMD):
       @ In, featureVals, numpy.ndarray, shape= (n_requests, n_timeStep, n_dimensions), an array of input data
       @ Out, returnEvaluation , dict, dictionary of values for each target (and pivot parameter)
     """
-    indeces = [0]
+    # without scheduling parameters there is a single sample, shared by all the requests
+    indeces = np.zeros(featureVals.shape[0], dtype=int)
     if len(self.parametersIDs):
       # extract the scheduling parameters (feats)
-      feats = np.asarray([featureVals[:, :, self.features.index(par)] for par in self.parametersIDs]).T[0, :, :]
+      feats = featureVals[:, 0, [self._featIdx[par] for par in self.parametersIDs]]
       # using nearest neighbour method to identify the index
-      indeces = self.neigh.predict(feats).astype(int)
+      _, indeces = self.KDTreeFinder.query(feats, k=1)
     nreqs = len(indeces)
     ### Initialize the final return value ###
     returnEvaluation = {}
     ### Extract the Actuator signal U ###
-    uVector = []
-    for varID in self.actuatorsID:
-      varIndex = self.features.index(varID)
-      uVector.append(featureVals[:, :, varIndex]) # uVector is a list now
-      returnEvaluation.update({varID: featureVals[:, :, varIndex] if nreqs > 1 else featureVals[:, :, varIndex].flatten()})
-    uVector = np.asarray(uVector) # the uVector is not centralized yet
+    # the uVector shape is (n_requests, n_timesteps, n_actuators)
+    uVector = featureVals[:, :, [self._featIdx[act] for act in self.actuatorsID]]
+    returnEvaluation.update(zip(self.actuatorsID, uVector.transpose(2, 0, 1) if nreqs > 1 else uVector[0].T))
     # Get the time steps for evaluation
-    tsEval = uVector.shape[-1] # ts_Eval = 100
+    tsEval = uVector.shape[1] # ts_Eval = 100
 
     ### Extract the initial state vector shape(n_requests,n_stateID)
-    initStates = np.asarray([featureVals[:, :, self.features.index(par)] for par in self.initStateID]).T[0, :, :]
+    initStates = featureVals[:, 0, [self._featIdx[par] for par in self.initStateID]]
+    # Centralize uVector and initState when required (the nominal values are the ones of the sample selected for each request)
+    if self.dmdParams['centerUXY']:
+      uVector = uVector - self.actuatorVals[indeces, 0:1, :]
+      initStates = initStates - self.stateVals[indeces, 0, :]
+    # the propagation is performed with the precision of the A, B and C matrices
+    dtype = self.__Atilde.dtype
+    uVector = uVector.astype(dtype, copy=False)
     # Initiate the evaluation array for evalX and evalY
-    evalX = np.zeros((len(indeces), tsEval, len(self.initStateID)))
-    evalY = np.zeros((len(indeces), tsEval, len(self.outputID)))
-
-    for cnt, index in enumerate(indeces):
-      # Centralize uVector and initState when required.
-      if self.dmdParams['centerUXY']:
-        uVector = uVector - self.actuatorVals[0, index, :]
-        initStates = initStates - self.stateVals[0, index, :]
-      evalX[cnt, 0, :] = initStates
-      evalY[cnt, 0, :] = np.dot(self.__Ctilde[index, :, :], evalX[cnt, 0, :])
+    evalX = np.zeros((len(indeces), tsEval, len(self.initStateID)), dtype=dtype)
+    evalY = np.zeros((len(indeces), tsEval, len(self.outputID)), dtype=dtype)
+
+    # the requests that share the same sample (same A, B and C) are propagated together
+    uniqueIndeces, inverse = np.unique(indeces, return_inverse=True)
+    propagate = _propagationKernel()
+    for k, index in enumerate(uniqueIndeces):
+      group = np.flatnonzero(inverse == k)
       ### perform the self-propagation of X, X[k+1] = A*X[k] + B*U[k] ###
-      for i in range(tsEval-1):
-        xPred = np.reshape(self.__Atilde[index,:,:].dot(evalX[cnt,i,:]) + self.__Btilde[index,:,:].dot(uVector[cnt,:,i]),(-1,1)).T
-        evalX[cnt, i+1, :] = xPred
-        evalY[cnt, i+1, :] = np.dot(self.__Ctilde[index,:,:], evalX[cnt,i+1,:])
-      # De-Centralize evalX and evalY when required.
-      if self.dmdParams['centerUXY']:
-        evalX = evalX + self.stateVals[0, index, :]
-        evalY = evalY + self.outputVals[0, index, :]
+      groupX = np.zeros((len(group), tsEval, len(self.initStateID)), dtype=dtype)
+      groupX[:, 0, :] = initStates[group]
+      if self.dmdParams['device'] == 'cuda':
+        groupX = self._propagateOnDevice(self.__Atilde[index], self.__Btilde[index], uVector[group], groupX)
+      else:
+        propagate(self.__Atilde[index], self.__Btilde[index], uVector[group], groupX)
+      evalX[group] = groupX
+      ### the outputs Y[k] = C*X[k] of the whole group are then computed with a single product ###
+      evalY[group] = groupX.dot(self.__Ctilde[index].T)
+    # De-Centralize evalX and evalY when required (all the requests at once)
+    if self.dmdParams['centerUXY']:
+      evalX += self.stateVals[indeces, 0:1, :]
+      evalY += self.outputVals[indeces, 0:1, :]
     ### Store the results to the dictionary "returnEvaluation"
-    for varID in self.stateID:
-      varIndex = self.stateID.index(varID)
-      returnEvaluation.update({varID: evalX[: , :, varIndex] if nreqs > 1 else evalX[: , :, varIndex].flatten()})
-    for varID in self.outputID:
-      varIndex = self.outputID.index(varID)
-      returnEvaluation.update({varID: evalY[: , :, varIndex] if nreqs > 1 else evalY[: , :, varIndex].flatten()})
+    returnEvaluation.update(zip(self.stateID, evalX.transpose(2, 0, 1) if nreqs > 1 else evalX[0].T))
+    returnEvaluation.update(zip(self.outputID, evalY.transpose(2, 0, 1) if nreqs > 1 else evalY[0].T))
 
     returnEvaluation[self.pivotParameterID] = np.asarray([self.pivotValues] * nreqs) if nreqs > 1 else self.pivotValues
     return returnEvaluation
 
+  def _propagateOnDevice(self, A, B, U, X):
+    """
+      Propagate the state equation X[k+1] = A*X[k] + B*U[k] of a group of requests on the GPU (CuPy)
+      @ In, A, np.ndarray, shape (n_states, n_states), the state matrix
+      @ In, B, np.ndarray, shape (n_states, n_actuators), the actuator matrix
+      @ In, U, np.ndarray, shape (n_requests, n_timesteps, n_actuators), the actuator signals
+      @ In, X, np.ndarray, shape (n_requests, n_timesteps, n_states), the states (X[:, 0] are the initial states)
+      @ Out, X, np.ndarray, shape (n_requests, n_timesteps, n_states), the propagated states (copied back to the host)
+    """
+    import cupy
+    X = cupy.asarray(X)
+    _propagateNumpy(cupy.asarray(A), cupy.asarray(B), cupy.asarray(U), X)
+    return cupy.asnumpy(X)
+
   def writeXMLPreamble(self, writeTo, targets = None):
     """
       Specific local method for printing anything desired to xml file at the begin of the print.
@@ -343,85 +503,83 @@ class DMDC(DMD):
     if "outputs" in what:
       writeTo.addScalar(target, "outputs", ' '.join(self.outputID))
     if "dmdTimeScale" in what:
-      writeTo.addScalar(target,"dmdTimeScale",' '.join(['%.3d' % elm for elm in self._getTimeScale()]))
-
-    for smp in range(self.stateVals.shape[1]):
+      writeTo.addScalar(target,"dmdTimeScale",_formatVector(self._getTimeScale(), '%.3d'))
+
+    # format the vectors and matrices of all the samples at once (one string per sample)
+    vectors = {}
+    if "UNorm" in what and self.dmdParams['centerUXY']:
+      vectors["UNorm"] = _formatRows(self.actuatorVals[:, 0, :])
+    if "XNorm" in what and self.dmdParams['centerUXY']:
+      vectors["XNorm"] = _formatRows(self.stateVals[:, 0, :])
+    if "XLast" in what:
+      vectors["XLast"] = _formatRows(self.stateVals[:, -1, :])
+    if "YNorm" in what and self.dmdParams['centerUXY']:
+      vectors["YNorm"] = _formatRows(self.outputVals[:, 0, :])
+    matrices = []
+    if "Atilde" in what:
+      matrices += [("Atilde", self.__Atilde), ("Btilde", self.__Btilde)]
+    if "Ctilde" in what and len(self.outputID) > 0:
+      matrices.append(("Ctilde", self.__Ctilde))
+    # the matrices of each sample are written transposed
+    matrices = {name: (_formatRows(mat.transpose(0, 2, 1).real), _formatRows(mat.transpose(0, 2, 1).imag),
+                       ",".join(str(x) for x in mat.shape[1:])) for name, mat in matrices}
+    if len(self.parametersIDs):
+      parameterStrings = [row.split() for row in _formatRows(self.parameterValues, '%.6e')]
+    for smp in range(self.stateVals.shape[0]):
       attributeDict = {}
       if len(self.parametersIDs):
-        attributeDict = {self.parametersIDs[index]:'%.6e' % self.parameterValues[smp,index] for index in range(len(self.parametersIDs))}
+        attributeDict = dict(zip(self.parametersIDs, parameterStrings[smp]))
       attributeDict["sample"] = str(smp)
+      for name, valCont in vectors.items():
+        writeTo.addVector(name, "realization", valCont[smp], root=targNode, attrs=attributeDict)
+      for name, (real, imaginary, shape) in matrices.items():
+        valDict = {'real': real[smp], 'imaginary': imaginary[smp], "matrixShape": shape}
+        writeTo.addVector(name, "realization", valDict, root=targNode, attrs=attributeDict)
 
-      if "UNorm" in what and self.dmdParams['centerUXY']:
-        valCont = " ".join(['%.8e' % elm for elm in self.actuatorVals[0, smp, :].T.flatten().tolist()])
-        writeTo.addVector("UNorm","realization",valCont, root=targNode, attrs=attributeDict)
-
-      if "XNorm" in what and self.dmdParams['centerUXY']:
-        valCont = " ".join(['%.8e' % elm for elm in self.stateVals[0, smp, :].T.flatten().tolist()])
-        writeTo.addVector("XNorm","realization",valCont, root=targNode, attrs=attributeDict)
-
-      if "XLast" in what:
-        valCont = " ".join(['%.8e' % elm for elm in self.stateVals[-1, smp, :].T.flatten().tolist()])
-        writeTo.addVector("XLast","realization",valCont, root=targNode, attrs=attributeDict)
-
-      if "YNorm" in what and self.dmdParams['centerUXY']:
-        valCont = " ".join(['%.8e' % elm for elm in self.outputVals[0, smp, :].T.flatten().tolist()])
-        writeTo.addVector("YNorm","realization",valCont, root=targNode, attrs=attributeDict)
-
-      if "Atilde" in what:
-        valDict = {'real': " ".join(['%.8e' % elm for elm in self.__Atilde[smp, :, :].T.real.flatten().tolist()]),
-                   'imaginary':" ".join(['%.8e' % elm for elm in self.__Atilde[smp, :, :].T.imag.flatten().tolist()]),
-                   "matrixShape":",".join(str(x) for x in np.shape(self.__Atilde[smp, :, :]))}
-        writeTo.addVector("Atilde","realization",valDict, root=targNode, attrs=attributeDict)
-
-        valDict = {'real': " ".join(['%.8e' % elm for elm in self.__Btilde[smp, :, :].T.real.flatten().tolist()]),
-                   'imaginary':" ".join(['%.8e' % elm for elm in self.__Btilde[smp, :, :].T.imag.flatten().tolist()]),
-                   "matrixShape":",".join(str(x) for x in np.shape(self.__Btilde[smp, :, :]))}
-        writeTo.addVector("Btilde","realization",valDict, root=targNode, attrs=attributeDict)
-
-      if "Ctilde" in what and len(self.outputID) > 0:
-        valDict = {'real': " ".join(['%.8e' % elm for elm in self.__Ctilde[smp, :, :].T.real.flatten().tolist()]),
-                   'imaginary':" ".join(['%.8e' % elm for elm in self.__Ctilde[smp, :, :].T.imag.flatten().tolist()]),
-                   "matrixShape":",".join(str(x) for x in np.shape(self.__Ctilde[smp, :, :]))}
-        writeTo.addVector("Ctilde","realization",valDict, root=targNode, attrs=attributeDict)
-
-  def _evaluateMatrices(self, X1, X2, U, Y1, rankSVD):
+  def _evaluateMatricesBatch(self, X1, X2, U, Y1, rankSVD):
     """
-      Evaluate the the matrices (A and B tilde)
-      @ In, X1, np.ndarray, n dimensional state vectors (n*L)
-      @ In, X2, np.ndarray, n dimensional state vectors (n*L)
-      @ In, U, np.ndarray, m-dimension control vector by L (m*L)
-      @ In, Y1, np.ndarray, m-dimension output vector by L (y*L)
+      Evaluate the the matrices (A, B and C tilde) of a stack of samples at once
+      @ In, X1, np.ndarray, n dimensional state vectors (nSamples*n*L)
+      @ In, X2, np.ndarray, n dimensional state vectors (nSamples*n*L)
+      @ In, U, np.ndarray, m-dimension control vector by L (nSamples*m*L)
+      @ In, Y1, np.ndarray, m-dimension output vector by L (nSamples*y*L)
       @ In, rankSVD, int, rank of the SVD
-      @ Out, A, np.ndarray, the A matrix
-      @ Out, B, np.ndarray, the B matrix
-      @ Out, C, np.ndarray, the C matrix
+      @ Out, A, np.ndarray, the A matrices (nSamples*n*n)
+      @ Out, B, np.ndarray, the B matrices (nSamples*n*m)
+      @ Out, C, np.ndarray, the C matrices (nSamples*y*n)
     """
-    n = len(X2)
+    n = X2.shape[1]
     # Omega Matrix, stack X1 and U
-    omega = np.concatenate((X1, U), axis=0)
-    # SVD
-    uTrucSVD, sTrucSVD, vTrucSVD = mathUtils.computeTruncatedSingularValueDecomposition(omega, rankSVD, False, False)
-    # Find the truncation rank triggered by "s>=SminValue"
-    rankTruc = sum(map(lambda x : x>=1e-6, sTrucSVD.tolist()))
-    if rankTruc < uTrucSVD.shape[1]:
-        uTruc = uTrucSVD[:, :rankTruc]
-        vTruc = vTrucSVD[:, :rankTruc]
-        sTruc = np.diag(sTrucSVD)[:rankTruc, :rankTruc]
-    else:
-        uTruc = uTrucSVD
-        vTruc = vTrucSVD
-        sTruc = np.diag(sTrucSVD)
-
-    # QR decomp. sTruc=qsTruc*rsTruc, qsTruc unitary, rsTruc upper triangular
-    qsTruc, rsTruc = np.linalg.qr(sTruc)
-    # if rsTruc is singular matrix, raise an error
-    if np.linalg.det(rsTruc) == 0:
+    omega = np.concatenate((X1, U), axis=1)
+    # SVD of Omega through the QR decomposition of its (tall and skinny) transpose:
+    #   omega^T = Q*R           (D1)
+    #   R = U_R*S*V_R^T         (D2)
+    #   => omega = V_R*S*(Q*U_R)^T
+    # hence the left-singular vectors of omega are V_R and the right-singular vectors are Q*U_R,
+    # while the SVD is only performed on the small R matrices (a single LAPACK dispatch for the whole stack)
+    qOmega, rOmega = map(np.asarray, zip(*_mapSamples(np.linalg.qr, omega.transpose(0, 2, 1))))
+    uR, sTrucSVD, vhR = np.linalg.svd(rOmega, full_matrices=False)
+    uTruc = vhR.transpose(0, 2, 1)
+    # Find the truncation rank (rankSVD) and keep only the singular values "s>=SminValue".
+    # The truncation rank can differ from sample to sample: the discarded singular values are
+    # replaced by 1 and their right-singular vectors are zeroed, so that they do not contribute
+    rank = np.asarray([mathUtils.computeTruncationRank(s, omega.shape[1:], rankSVD) for s in sTrucSVD])
+    keep = (np.arange(sTrucSVD.shape[1]) < rank[:, None]) & (sTrucSVD >= 1e-6)
+    # if no singular value is kept for a sample, rsTruc is singular: raise an error
+    if not np.all(np.any(keep, axis=1)):
       self.raiseAnError(RuntimeError, "The R matrix is singlular, Please check the singularity of [X1;U]!")
-    beta = X2.dot(vTruc).dot(np.linalg.inv(rsTruc)).dot(qsTruc.T)
-    A = beta.dot(uTruc[0:n, :].T)
-    B = beta.dot(uTruc[n:, :].T)
-    C = Y1.dot(scipy.linalg.pinv2(X1))
+    vTruc = np.einsum('sij,sjk->sik', qOmega, uR) * keep[:, None, :]
+    # QR decomp. of the diagonal sTruc is trivial: qsTruc is the identity and rsTruc = sTruc is diagonal,
+    # hence the triangular solve of rsTruc reduces to a scaling of the columns of vTruc
+    rsTruc = np.where(keep, sTrucSVD, 1.)
+    beta = np.einsum('sij,sjk->sik', X2, vTruc / rsTruc[:, None, :])
+    A = np.einsum('sij,skj->sik', beta, uTruc[:, :n, :])
+    B = np.einsum('sij,skj->sik', beta, uTruc[:, n:, :])
+    # C = Y1*pinv(X1) is obtained as the least-squares solution of X1^T*C^T = Y1^T (no pseudo-inverse is formed)
+    # with the same cut-off of the (deprecated) scipy.linalg.pinv2
+    C = np.zeros((Y1.shape[0], Y1.shape[1], n))
+    if Y1.shape[1] > 0:
+      cond = np.finfo(X1.dtype).eps * 1e6
+      C[:] = _mapSamples(lambda x1, y1: scipy.linalg.lstsq(x1.T, y1.T, cond=cond, lapack_driver='gelsy', check_finite=False)[0].T, X1, Y1)
 
     return A, B, C
-
-
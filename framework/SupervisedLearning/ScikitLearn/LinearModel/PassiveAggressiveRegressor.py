@@ -19,9 +19,17 @@
 
 """
 #Internal Modules (Lazy Importer)--------------------------------------------------------------------
+from utils.importerUtils import importModuleLazy, importModuleLazyRenamed, isLibAvail
 #Internal Modules (Lazy Importer) End----------------------------------------------------------------
 
 #External Modules------------------------------------------------------------------------------------
+import os
+import copy
+import functools
+from concurrent import futures
+np = importModuleLazy("numpy")
+sparse = importModuleLazyRenamed("sparse", globals(), "scipy.sparse")
+linear_model = importModuleLazyRenamed("linear_model", globals(), "sklearn.linear_model")
 #External Modules End--------------------------------------------------------------------------------
 
 #Internal Modules------------------------------------------------------------------------------------
@@ -29,12 +37,142 @@ from SupervisedLearning.ScikitLearn import ScikitLearnBase
 from utils import InputData, InputTypes
 #Internal Modules End--------------------------------------------------------------------------------
 
+# the enumerated types of the parameters are built once, at import
+lossType = InputTypes.makeEnumType("loss", "lossType", ['epsilon_insensitive', 'squared_epsilon_insensitive'])
+engineType = InputTypes.makeEnumType("engine", "engineType", ['sklearn', 'numba'])
+
+def _passiveAggressiveEpoch(X, y, order, coef, intercept, C, epsilon, squared, fitIntercept):
+  """
+    One pass of the passive-aggressive (PA-I or PA-II) regression updates over the training samples
+    (this is the kernel compiled by numba, when available)
+    @ In, X, np.ndarray, shape (n_samples, n_features), the feature values
+    @ In, y, np.ndarray, shape (n_samples,), the target values
+    @ In, order, np.ndarray, shape (n_samples,), the order in which the samples are visited
+    @ In, coef, np.ndarray, shape (n_features,), the weights (updated in place)
+    @ In, intercept, np.ndarray, shape (1,), the intercept (updated in place)
+    @ In, C, float, the maximum step size (regularization)
+    @ In, epsilon, float, the width of the insensitive region of the loss
+    @ In, squared, bool, True for PA-II (squared_epsilon_insensitive), False for PA-I (epsilon_insensitive)
+    @ In, fitIntercept, bool, True if the intercept is updated
+    @ Out, totalLoss, float, the sum of the epsilon-insensitive losses over the pass
+  """
+  nFeatures = X.shape[1]
+  totalLoss = 0.0
+  for i in order:
+    pred = intercept[0]
+    norm = 0.0
+    for j in range(nFeatures):
+      pred += X[i, j] * coef[j]
+      norm += X[i, j] * X[i, j]
+    err = y[i] - pred
+    loss = abs(err) - epsilon
+    if loss <= 0.0:
+      continue
+    totalLoss += loss
+    # closed-form step size
+    if squared:
+      tau = loss / (norm + 0.5 / C)
+    elif norm > 0.0:
+      tau = min(C, loss / norm)
+    else:
+      tau = C
+    if err < 0.0:
+      tau = -tau
+    for j in range(nFeatures):
+      coef[j] += tau * X[i, j]
+    if fitIntercept:
+      intercept[0] += tau
+  return totalLoss
+
+@functools.lru_cache(maxsize=None)
+def _epochKernel():
+  """
+    Get the passive-aggressive epoch kernel, compiled by numba when available (at the first request only)
+    @ In, None
+    @ Out, kernel, function, the epoch kernel
+  """
+  if isLibAvail("numba"):
+    from numba import njit
+    # the kernel only works on arrays: it releases the GIL, so that the shards of n_jobs are fitted concurrently
+    return njit(cache=True, fastmath=True, nogil=True)(_passiveAggressiveEpoch)
+  return _passiveAggressiveEpoch
+
 class PassiveAggressiveRegressor(ScikitLearnBase):
   """
     Passive Aggressive Regressor
   """
   info = {'problemtype':'regression', 'normalize':True}
 
+  # name, type, description and default value of the parameters of the estimator
+  _paramSpecs = (
+    ("C", InputTypes.FloatType,
+     r"""Maximum step size (regularization).""", 1.0),
+    ("fit_intercept", InputTypes.BoolType,
+     r"""Whether the intercept should be estimated or not. If False,
+                                                  the data is assumed to be already centered.""", True),
+    ("max_iter", InputTypes.IntegerType,
+     r"""The maximum number of passes over the training data (aka epochs).""", 1000),
+    ("tol", InputTypes.FloatType,
+     r"""The stopping criterion.""", 1e-3),
+    ("epsilon", InputTypes.FloatType,
+     r"""If the difference between the current prediction and the
+                                                 correct label is below this threshold, the model is not updated.""", 0.1),
+    ("early_stopping", InputTypes.BoolType,
+     r"""hether to use early stopping to terminate training when validation score is not
+                                                 improving. If set to True, it will automatically set aside a stratified fraction of training
+                                                 data as validation and terminate training when validation score is not improving by at least
+                                                 tol for n_iter_no_change consecutive epochs.""", False),
+    ("validation_fraction", InputTypes.FloatType,
+     r"""The proportion of training data to set aside as validation set for early stopping.
+                                                 Must be between 0 and 1. Only used if early_stopping is True.""", 0.1),
+    ("n_iter_no_change", InputTypes.IntegerType,
+     r"""Number of iterations with no improvement to wait before early stopping.""", 5),
+    ("shuffle", InputTypes.BoolType,
+     r"""Whether or not the training data should be shuffled after each epoch.""", True),
+    ("loss", lossType,
+     r"""The loss function to be used: epsilon_insensitive: equivalent to PA-I.
+                                                 squared_epsilon_insensitive: equivalent to PA-II.""", 'epsilon_insensitive'),
+    ("random_state", InputTypes.IntegerType,
+     r"""Used to shuffle the training data, when shuffle is set to
+                                                 True. Pass an int for reproducible output across multiple function calls.""", None),
+    ("verbose", InputTypes.IntegerType,
+     r"""The verbosity level""", 0),
+    ("warm_start", InputTypes.BoolType,
+     r"""When set to True, reuse the solution of the previous call
+                                                 to fit as initialization, otherwise, just erase the previous solution.
+                                                 If not provided, the previous solution is reused only when the ROM is
+                                                 re-trained on a training set that extends the previous one (e.g. adaptive
+                                                 sampling), so that the new training starts from nearly optimal weights;
+                                                 any other re-training (e.g. cross validation folds or after a reset of
+                                                 the ROM) starts from scratch.""", None),
+    ("average", InputTypes.BoolType,
+     r"""When set to True, computes the averaged SGD weights and
+                                                 stores the result in the coef_ attribute. """, False),
+    ("batch_size", InputTypes.IntegerType,
+     r"""If provided, the model is trained on mini-batches of batch\_size
+                                                 contiguous samples (of the shuffled training data if shuffle is True) through
+                                                 successive partial fits, instead of a single fit on the whole training data.
+                                                 In this case, max\_iter is the number of passes over the training data
+                                                 (epochs) and the stopping criterion (tol, early\_stopping) is not used.""", None),
+    ("n_jobs", InputTypes.IntegerType,
+     r"""If provided (and greater than 1), the training data are split in n\_jobs
+                                                 disjoint shards (after shuffling, if shuffle is True) and an independent copy of
+                                                 the model is fitted on each of them in parallel. The weights (coef\_ and
+                                                 intercept\_) of the final model are the average of the weights of the copies.
+                                                 -1 means using all processors.""", None),
+    ("engine", engineType,
+     r"""The implementation used to fit the model. ``sklearn'' uses the scikit-learn solver.
+                                                 ``numba'' uses an in-house implementation of the PA-I/PA-II updates, compiled
+                                                 with numba (if numba is not available, the same updates run in pure Python, which
+                                                 is much slower). The in-house implementation processes one sample at a time
+                                                 (batch\_size is not used) and does not support early\_stopping and average.""", 'sklearn'),
+    ("sparse", InputTypes.BoolType,
+     r"""If True, the training features are passed to the scikit-learn solver as a sparse (CSR) matrix,
+                                                 whose updates only visit the non-zero entries. This is faster for features that are
+                                                 mostly zeros. To preserve the sparsity, the features are only scaled by their standard
+                                                 deviation (not centered) by the normalization. Not used by the ``numba'' engine.""", False),
+  )
+
   def __init__(self):
     """
       Constructor that will appropriately initialize a supervised learning object
@@ -42,9 +180,13 @@ class PassiveAggressiveRegressor(ScikitLearnBase):
       @ Out, None
     """
     super().__init__()
-    import sklearn
-    import sklearn.linear_model
-    self.model = sklearn.linear_model.PassiveAggressiveRegressor
+    self.model = linear_model.PassiveAggressiveRegressor
+    self.batchSize = None # if not None, size of the mini-batches used to train the model with partial_fit
+    self.nJobs = None # if not None, number of shards of the training data fitted in parallel (weights averaged)
+    self.autoWarmStart = False # True if warm_start is not provided, to warm start the incremental re-trainings
+    self.previousFeatures = None # (raw) feature values of the last training, to detect the incremental re-trainings
+    self.engine = 'sklearn' # implementation used to fit the model (scikit-learn or in-house compiled updates)
+    self.sparse = False # True to train the scikit-learn solver on sparse (CSR) features
 
   @classmethod
   def getInputSpecification(cls):
@@ -55,7 +197,11 @@ class PassiveAggressiveRegressor(ScikitLearnBase):
       @ Out, inputSpecification, InputData.ParameterInput, class to use for
         specifying input of cls.
     """
-    specs = super(PassiveAggressiveRegressor, cls).getInputSpecification()
+    # the specification is built once per class (not inherited by the subclasses)
+    specs = cls.__dict__.get('_cachedSpecs')
+    if specs is not None:
+      return specs
+    specs = super().getInputSpecification()
     specs.description = r"""The \xmlNode{PassiveAggressiveRegressor}
                         is a a regression algorithm similar to the Perceptron algorithm
                         but with a regularization parameter C.
@@ -63,46 +209,9 @@ class PassiveAggressiveRegressor(ScikitLearnBase):
                         large-scale learning.
                         \zNormalizationPerformed{PassiveAggressiveRegressor}
                         """
-    specs.addSub(InputData.parameterInputFactory("C", contentType=InputTypes.FloatType,
-                                                 descr=r"""Maximum step size (regularization).""", default=1.0))
-    specs.addSub(InputData.parameterInputFactory("fit_intercept", contentType=InputTypes.BoolType,
-                                                 descr=r"""Whether the intercept should be estimated or not. If False,
-                                                  the data is assumed to be already centered.""", default=True))
-    specs.addSub(InputData.parameterInputFactory("max_iter", contentType=InputTypes.IntegerType,
-                                                 descr=r"""The maximum number of passes over the training data (aka epochs).""", default=1000))
-    specs.addSub(InputData.parameterInputFactory("tol", contentType=InputTypes.FloatType,
-                                                 descr=r"""The stopping criterion.""", default=1e-3))
-    specs.addSub(InputData.parameterInputFactory("epsilon", contentType=InputTypes.FloatType,
-                                                 descr=r"""If the difference between the current prediction and the
-                                                 correct label is below this threshold, the model is not updated.""",
-                                                 default=0.1))
-    specs.addSub(InputData.parameterInputFactory("early_stopping", contentType=InputTypes.BoolType,
-                                                 descr=r"""hether to use early stopping to terminate training when validation score is not
-                                                 improving. If set to True, it will automatically set aside a stratified fraction of training
-                                                 data as validation and terminate training when validation score is not improving by at least
-                                                 tol for n_iter_no_change consecutive epochs.""", default=False))
-    specs.addSub(InputData.parameterInputFactory("validation_fraction", contentType=InputTypes.FloatType,
-                                                 descr=r"""The proportion of training data to set aside as validation set for early stopping.
-                                                 Must be between 0 and 1. Only used if early_stopping is True.""", default=0.1))
-    specs.addSub(InputData.parameterInputFactory("n_iter_no_change", contentType=InputTypes.IntegerType,
-                                                descr=r"""Number of iterations with no improvement to wait before early stopping.""", default=5))
-    specs.addSub(InputData.parameterInputFactory("shuffle", contentType=InputTypes.BoolType,
-                                                 descr=r"""Whether or not the training data should be shuffled after each epoch.""", default=True))
-    specs.addSub(InputData.parameterInputFactory("loss", contentType=InputTypes.makeEnumType("loss", "lossType",['epsilon_insensitive', ' squared_epsilon_insensitive']),
-                                                 descr=r"""The loss function to be used: epsilon_insensitive: equivalent to PA-I.
-                                                 squared_epsilon_insensitive: equivalent to PA-II.""", default='epsilon_insensitive'))
-    specs.addSub(InputData.parameterInputFactory("random_state", contentType=InputTypes.IntegerType,
-                                                 descr=r"""Used to shuffle the training data, when shuffle is set to
-                                                 True. Pass an int for reproducible output across multiple function calls.""",
-                                                 default=None))
-    specs.addSub(InputData.parameterInputFactory("verbose", contentType=InputTypes.IntegerType,
-                                                 descr=r"""The verbosity level""", default=0))
-    specs.addSub(InputData.parameterInputFactory("warm_start", contentType=InputTypes.BoolType,
-                                                 descr=r"""When set to True, reuse the solution of the previous call
-                                                 to fit as initialization, otherwise, just erase the previous solution.""", default=False))
-    specs.addSub(InputData.parameterInputFactory("average", contentType=InputTypes.BoolType,
-                                                 descr=r"""When set to True, computes the averaged SGD weights and
-                                                 stores the result in the coef_ attribute. """, default=False))
+    for name, contentType, descr, default in cls._paramSpecs:
+      specs.addSub(InputData.parameterInputFactory(name, contentType=contentType, descr=descr, default=default))
+    cls._cachedSpecs = specs
     return specs
 
   def _handleInput(self, paramInput):
@@ -111,11 +220,204 @@ class PassiveAggressiveRegressor(ScikitLearnBase):
       @ In, paramInput, ParameterInput, the already parsed input.
       @ Out, None
     """
-    super()._handleInput( paramInput)
-    settings, notFound = paramInput.findNodesAndExtractValues(['C','fit_intercept','max_iter',
-                                                               'tol','early_stopping','validation_fraction',
-                                                               'n_iter_no_change','shuffle','loss', 'epsilon',
-                                                               'random_state', 'verbose', 'warm_start', 'average'])
-    # notFound must be empty
-    assert(not notFound)
+    super()._handleInput(paramInput)
+    settings = self._extractSettings(paramInput)
+    # batch_size drives the training loop, it is not a setting of the estimator
+    self.batchSize = settings.pop('batch_size')
+    if self.batchSize is not None and self.batchSize < 1:
+      self.raiseAnError(IOError, 'The "batch_size" of ROM', self.name, 'must be a positive integer! Got', self.batchSize)
+    # n_jobs drives the parallel training, it is not a setting of the estimator
+    self.nJobs = settings.pop('n_jobs')
+    # if warm_start is not provided, it is activated by the incremental re-trainings only (see _fitModel)
+    self.autoWarmStart = settings['warm_start'] is None
+    if self.autoWarmStart:
+      settings['warm_start'] = False
+    # engine selects the implementation of the fit, it is not a setting of the estimator
+    self.engine = settings.pop('engine')
+    # sparse selects the storage of the training features, it is not a setting of the estimator
+    self.sparse = settings.pop('sparse')
+    if self.engine == 'numba':
+      if not isLibAvail("numba"):
+        self.raiseAWarning('The engine "numba" of ROM', self.name, 'requires the numba library, which is not available.',
+                           'The in-house updates will run in pure Python!')
+      if settings['early_stopping'] or settings['average']:
+        self.raiseAWarning('The engine "numba" of ROM', self.name, 'does not support early_stopping and average. They are ignored!')
+      if self.sparse:
+        self.raiseAWarning('The engine "numba" of ROM', self.name, 'does not support sparse features. The dense features are used!')
     self.initializeModel(settings)
+
+  def _isIncrementalTraining(self, featureVals):
+    """
+      Check if the training set extends the one of the previous training (same points first, new points
+      appended), as for the re-trainings of the adaptive samplers
+      @ In, featureVals, np.array, shape=[n_samples, n_features], the (normalized) feature values
+      @ Out, incremental, bool, True if the previous training set is the leading part of the current one
+    """
+    # the normalization changes with the training set, compare the raw values
+    mu = np.asarray([self.muAndSigmaFeatures[feat][0] for feat in self.features])
+    sigma = np.asarray([self.muAndSigmaFeatures[feat][1] for feat in self.features])
+    rawFeatures = featureVals * sigma + mu
+    previous = self.previousFeatures
+    self.previousFeatures = rawFeatures
+    if previous is None or len(previous) >= len(rawFeatures) or previous.shape[1:] != rawFeatures.shape[1:]:
+      return False
+    return np.allclose(previous, rawFeatures[:len(previous)])
+
+  def _fitEstimator(self, model, featureVals, targetVals, warmStart):
+    """
+      Fit a scikit-learn model, with successive partial fits on mini-batches if requested
+      @ In, model, sklearn estimator, the model to fit
+      @ In, featureVals, {array-like, sparse matrix}, shape=[n_samples, n_features],
+        an array of input feature values
+      @ In, targetVals, array, shape = [n_samples,n_targets], an array of output target
+        associated with the corresponding points in featureVals
+      @ In, warmStart, bool, True to start from the weights of the (already fitted) model
+      @ Out, model, sklearn estimator, the fitted model
+    """
+    if self.engine == 'numba':
+      return self._fitInHouse(model, featureVals, targetVals, warmStart)
+    if self.batchSize is None:
+      if warmStart and hasattr(model, 'estimators_'):
+        # the multi-target wrapper clones the estimators in fit, the fitted ones are directly re-fitted instead
+        for index, estimator in enumerate(model.estimators_):
+          estimator.fit(featureVals, targetVals[:, index], coef_init=estimator.coef_, intercept_init=estimator.intercept_)
+      else:
+        model.fit(featureVals, targetVals)
+      return model
+    from sklearn.base import clone
+    if not warmStart:
+      # start from a fresh (unfitted) model, as fit would do
+      model = clone(model)
+    nSamples = featureVals.shape[0]
+    rng = np.random.RandomState(self.settings['random_state'])
+    for _ in range(self.settings['max_iter']):
+      order = rng.permutation(nSamples) if self.settings['shuffle'] else np.arange(nSamples)
+      for start in range(0, nSamples, self.batchSize):
+        batch = order[start:start+self.batchSize]
+        model.partial_fit(featureVals[batch], targetVals[batch])
+    return model
+
+  def _fitInHouse(self, model, featureVals, targetVals, warmStart):
+    """
+      Fit the multi-target model with the in-house passive-aggressive updates, one target at a time
+      @ In, model, sklearn.multioutput.MultiOutputRegressor, the model to fit
+      @ In, featureVals, np.array, shape=[n_samples, n_features], an array of input feature values
+      @ In, targetVals, array, shape = [n_samples,n_targets], an array of output target
+        associated with the corresponding points in featureVals
+      @ In, warmStart, bool, True to start from the weights of the (already fitted) model
+      @ Out, model, sklearn.multioutput.MultiOutputRegressor, the fitted model
+    """
+    from sklearn.base import clone
+    kernel = _epochKernel()
+    X = np.ascontiguousarray(featureVals, dtype=float)
+    nSamples, nFeatures = X.shape
+    nTargets = targetVals.shape[1]
+    if not (warmStart and hasattr(model, 'estimators_')):
+      model = clone(model)
+      model.estimators_ = [clone(model.estimator) for _ in range(nTargets)]
+    settings = self.settings
+    squared = settings['loss'] == 'squared_epsilon_insensitive'
+    rng = np.random.RandomState(settings['random_state'])
+    for index, estimator in enumerate(model.estimators_):
+      y = np.ascontiguousarray(targetVals[:, index], dtype=float)
+      fitted = hasattr(estimator, 'coef_')
+      coef = estimator.coef_.astype(float) if fitted else np.zeros(nFeatures)
+      intercept = np.atleast_1d(estimator.intercept_).astype(float) if fitted else np.zeros(1)
+      # same stopping criterion as scikit-learn: no improvement of the loss by tol for n_iter_no_change epochs
+      bestLoss = np.inf
+      noImprovement = 0
+      nIter = 0
+      for _ in range(settings['max_iter']):
+        nIter += 1
+        order = rng.permutation(nSamples) if settings['shuffle'] else np.arange(nSamples)
+        loss = kernel(X, y, order, coef, intercept, settings['C'], settings['epsilon'], squared, settings['fit_intercept'])
+        if settings['tol'] is not None:
+          noImprovement = noImprovement + 1 if loss > bestLoss - settings['tol'] * nSamples else 0
+          if noImprovement >= settings['n_iter_no_change']:
+            break
+        bestLoss = min(bestLoss, loss)
+      estimator.coef_ = coef
+      estimator.intercept_ = intercept
+      estimator.n_iter_ = nIter
+      estimator.t_ = estimator.n_iter_ * nSamples + 1.
+    return model
+
+  def _fitsInParallel(self):
+    """
+      Check if the ROM runs concurrent fits in threads of the current process
+      @ In, None
+      @ Out, fitsInParallel, bool, True if the training data are split in shards fitted in parallel
+    """
+    return self.nJobs is not None and self.nJobs not in (0, 1)
+
+  def _fitModel(self, featureVals, targetVals):
+    """
+      Fit the underlying scikit-learn model. If n_jobs is requested, the training data are split
+      in disjoint shards, a copy of the model is fitted on each shard in parallel and the final
+      weights are the average of the weights of the copies (parallel SGD with weight averaging)
+      @ In, featureVals, {array-like, sparse matrix}, shape=[n_samples, n_features],
+        an array of input feature values
+      @ In, targetVals, array, shape = [n_samples,n_targets], an array of output target
+        associated with the corresponding points in featureVals
+      @ Out, None
+    """
+    incremental = self._isIncrementalTraining(featureVals) if self.autoWarmStart else False
+    warmStart = self.settings['warm_start'] or incremental
+    if self.sparse and self.engine == 'sklearn':
+      featureVals = sparse.csr_matrix(featureVals)
+    nSamples = featureVals.shape[0]
+    nJobs = (os.cpu_count() or 1) if self.nJobs == -1 else (self.nJobs or 1)
+    nShards = min(nJobs, nSamples)
+    if nShards < 2:
+      self.model = self._fitEstimator(self.model, featureVals, targetVals, warmStart)
+      return
+    from sklearn.base import clone
+    rng = np.random.RandomState(self.settings['random_state'])
+    order = rng.permutation(nSamples) if self.settings['shuffle'] else np.arange(nSamples)
+    shards = np.array_split(order, nShards)
+    # with warm_start each copy starts from the current weights, otherwise from scratch
+    initModel = copy.deepcopy if warmStart else clone
+    # the SGD solver releases the GIL, so the copies are fitted by a pool of threads
+    with futures.ThreadPoolExecutor(max_workers=nShards) as executor:
+      fitShard = lambda shard: self._fitEstimator(initModel(self.model), featureVals[shard], targetVals[shard], warmStart)
+      models = list(executor.map(fitShard, shards))
+    # the (multi-target) model is the first copy, with the weights averaged over all the copies
+    self.model = models[0]
+    for index, estimator in enumerate(self.model.estimators_):
+      estimator.coef_ = np.mean([model.estimators_[index].coef_ for model in models], axis=0)
+      estimator.intercept_ = np.mean([model.estimators_[index].intercept_ for model in models], axis=0)
+
+  def _localNormalizeData(self,values,names,feat):
+    """
+      Overwrites default normalization procedure: with sparse features, the features are not centered.
+      @ In, values, list, list of feature values (from tdict)
+      @ In, names, list, names of features (from tdict)
+      @ In, feat, list, list of features (from ROM)
+      @ Out, None
+    """
+    super()._localNormalizeData(values,names,feat)
+    if self.sparse:
+      # centering would fill the zeros of the features, only the scaling is kept
+      self.muAndSigmaFeatures[feat] = (0.0, self.muAndSigmaFeatures[feat][1])
+
+  def __getstate__(self):
+    """
+      This function return the state of the ROM
+      @ In, None
+      @ Out, state, dict, it contains all the information needed by the ROM to be initialized
+    """
+    state = super().__getstate__()
+    # the copy of the last training set is only needed to warm start the next training of this instance,
+    # it is not stored (the copies and the reloaded ROMs are trained from scratch)
+    state['previousFeatures'] = None
+    return state
+
+  def __resetLocal__(self):
+    """
+      Reset ROM. After this method the ROM should be described only by the initial parameter settings
+      @ In, None
+      @ Out, None
+    """
+    super().__resetLocal__()
+    # the next training must not be warm started from the current weights
+    self.previousFeatures = None
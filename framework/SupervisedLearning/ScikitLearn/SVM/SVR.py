@@ -19,12 +19,15 @@
 
 """
 #Internal Modules (Lazy Importer)--------------------------------------------------------------------
-from utils.importerUtils import importModuleLazy
+from utils.importerUtils import importModuleLazy, importModuleLazyRenamed, isLibAvail
 #Internal Modules (Lazy Importer) End----------------------------------------------------------------
 
 #External Modules------------------------------------------------------------------------------------
 np = importModuleLazy("numpy")
-import ast
+svm = importModuleLazyRenamed("svm", globals(), "sklearn.svm")
+pipeline = importModuleLazyRenamed("pipeline", globals(), "sklearn.pipeline")
+kernel_approximation = importModuleLazyRenamed("kernel_approximation", globals(), "sklearn.kernel_approximation")
+linear_model = importModuleLazyRenamed("linear_model", globals(), "sklearn.linear_model")
 #External Modules End--------------------------------------------------------------------------------
 
 #Internal Modules------------------------------------------------------------------------------------
@@ -33,12 +36,87 @@ from utils import utils
 from utils import InputData, InputTypes
 #Internal Modules End--------------------------------------------------------------------------------
 
+# the enumerated types of the parameters are built once, at import
+kernelType = InputTypes.makeEnumType("kernel", "kernelType", ['linear', 'poly', 'rbf', 'sigmoid'])
+approxType = InputTypes.makeEnumType("approx", "approxType", ['none', 'liblinear', 'nystroem'])
+
+def _nystroemRegressor(kernel, gamma, degree, coef0, n_components, alpha):
+  """
+    Build the approximated kernel regressor: Nystroem approximation of the kernel map followed by a ridge regression
+    @ In, kernel, str, the kernel type
+    @ In, gamma, float, the kernel coefficient
+    @ In, degree, int, the degree of the polynomial kernel
+    @ In, coef0, float, the independent term of the kernel
+    @ In, n_components, int, the number of samples used to build the approximated kernel map
+    @ In, alpha, float, the regularization strength of the ridge regression
+    @ Out, model, sklearn.pipeline.Pipeline, the regressor
+  """
+  # the components are sampled with a fixed seed, for the reproducibility of the training
+  nystroem = kernel_approximation.Nystroem(kernel=kernel, gamma=gamma, degree=degree, coef0=coef0,
+                                           n_components=n_components, random_state=0)
+  return pipeline.make_pipeline(nystroem, linear_model.Ridge(alpha=alpha))
+
 class SVR(ScikitLearnBase):
   """
     Support Vector Regressor
   """
   info = {'problemtype':'regression', 'normalize':True}
 
+  # name, type, description and default value of the parameters of the estimator
+  _paramSpecs = (
+    # penalty
+    ('C', InputTypes.FloatType,
+     r"""Regularization parameter. The strength of the regularization is inversely
+                                                           proportional to C.
+                                                           Must be strictly positive. The penalty is a squared l2 penalty..""", 1.0),
+    ("kernel", kernelType,
+     r"""Specifies the kernel type to be used in the algorithm. It must be one of
+                                                            ``linear'', ``poly'', ``rbf'' or ``sigmoid''.""", 'rbf'),
+    ("degree", InputTypes.IntegerType,
+     r"""Degree of the polynomial kernel function ('poly').Ignored by all other kernels.""", 3),
+    ("gamma", InputTypes.FloatType,
+     r"""Kernel coefficient for ``poly'', ``rbf'' or ``sigmoid''. If not input, then it uses
+                                                           $1 / (n_features * X.var())$ as value of gamma""", "scale"),
+    ("coef0", InputTypes.FloatType,
+     r"""Independent term in kernel function""", 0.0),
+    ("tol", InputTypes.FloatType,
+     r"""Tolerance for stopping criterion""", 1e-3),
+    ("cache_size", InputTypes.FloatType,
+     r"""Size of the kernel cache (in MB). If not provided, it is sized at training time to hold the
+                                                 kernel matrix of the training set, with at least 200 MB and at most a quarter of the
+                                                 available memory.""", None),
+    ("epsilon", InputTypes.FloatType,
+     r"""Epsilon in the epsilon-SVR model. It specifies the epsilon-tube
+                                                           within which no penalty is associated in the training loss function
+                                                           with points predicted within a distance epsilon from the actual
+                                                           value.""", 0.1),
+    ("shrinking", InputTypes.BoolType,
+     r"""Whether to use the shrinking heuristic.""", True),
+    ("max_iter", InputTypes.IntegerType,
+     r"""Hard limit on iterations within solver.``-1'' for no limit""", -1),
+    ("verbose", InputTypes.BoolType,
+     r"""Enable verbose output. Note that this setting takes advantage
+                                                 of a per-process runtime setting in libsvm that, if enabled, may not
+                                                 work properly in a multithreaded context.""", False),
+    ("n_jobs", InputTypes.IntegerType,
+     r"""The number of jobs to use for the computation: when multiple targets
+                                                 are requested, the model of each target is fitted in parallel. None means 1
+                                                 unless in a joblib.parallel\_backend context. -1 means using all processors.""", None),
+    ("approx", approxType,
+     r"""Solver used to train the model, to scale to large datasets.
+                                                 ``none'' uses the exact libsvm solver, whose fit time complexity is more than
+                                                 quadratic with the number of samples.
+                                                 ``liblinear'' (only with the ``linear'' kernel) uses the liblinear solver of
+                                                 \textit{LinearSVR}, whose complexity is linear with the number of samples;
+                                                 gamma, degree, coef0, cache\_size and shrinking are not used, and the intercept is
+                                                 regularized as the other coefficients. ``nystroem'' approximates the kernel map with
+                                                 the Nystroem method on n\_components samples and fits a ridge regression (with
+                                                 regularization strength $1/(2C)$) on the mapped features; epsilon, tol, cache\_size,
+                                                 shrinking and max\_iter are not used.""", 'none'),
+    ("n_components", InputTypes.IntegerType,
+     r"""Number of training samples used to build the approximated kernel map, if approx is ``nystroem''.""", 100),
+  )
+
   def __init__(self):
     """
       Constructor that will appropriately initialize a supervised learning object
@@ -46,9 +124,9 @@ class SVR(ScikitLearnBase):
       @ Out, None
     """
     super().__init__()
-    import sklearn
-    import sklearn.svm
-    self.model = sklearn.svm.SVR
+    self.model = svm.SVR
+    self.approx = 'none' # solver used to train the model (exact, liblinear or Nystroem approximation)
+    self.autoCacheSize = False # True if the kernel cache is sized on the training set
 
   @classmethod
   def getInputSpecification(cls):
@@ -59,7 +137,11 @@ class SVR(ScikitLearnBase):
       @ Out, inputSpecification, InputData.ParameterInput, class to use for
         specifying input of cls.
     """
-    specs = super(SVR, cls).getInputSpecification()
+    # the specification is built once per class (not inherited by the subclasses)
+    specs = cls.__dict__.get('_cachedSpecs')
+    if specs is not None:
+      return specs
+    specs = super().getInputSpecification()
     specs.description = r"""The \xmlNode{SVR} \textit{Support Vector Regression} is an epsilon-Support Vector Regression.
                             The free parameters in this model are C and epsilon. The implementations is a based on libsvm.
                             The implementation is based on libsvm. The fit time complexity
@@ -67,40 +149,9 @@ class SVR(ScikitLearnBase):
                             to scale to datasets with more than a couple of 10000 samples.
                             \zNormalizationPerformed{SVR}
                             """
-    # penalty
-    specs.addSub(InputData.parameterInputFactory('C', contentType=InputTypes.FloatType,
-                                                 descr=r"""Regularization parameter. The strength of the regularization is inversely
-                                                           proportional to C.
-                                                           Must be strictly positive. The penalty is a squared l2 penalty..""", default=1.0))
-    specs.addSub(InputData.parameterInputFactory("kernel", contentType=InputTypes.makeEnumType("kernel", "kernelType",['linear','poly',
-                                                                                                                       'rbf','sigmoid']),
-                                                 descr=r"""Specifies the kernel type to be used in the algorithm. It must be one of
-                                                            ``linear'', ``poly'', ``rbf'' or ``sigmoid''.""", default='rbf'))
-    specs.addSub(InputData.parameterInputFactory("degree", contentType=InputTypes.IntegerType,
-                                                 descr=r"""Degree of the polynomial kernel function ('poly').Ignored by all other kernels.""",
-                                                 default=3))
-    specs.addSub(InputData.parameterInputFactory("gamma", contentType=InputTypes.FloatType,
-                                                 descr=r"""Kernel coefficient for ``poly'', ``rbf'' or ``sigmoid''. If not input, then it uses
-                                                           $1 / (n_features * X.var())$ as value of gamma""", default="scale"))
-    specs.addSub(InputData.parameterInputFactory("coef0", contentType=InputTypes.FloatType,
-                                                 descr=r"""Independent term in kernel function""", default=0.0))
-    specs.addSub(InputData.parameterInputFactory("tol", contentType=InputTypes.FloatType,
-                                                 descr=r"""Tolerance for stopping criterion""", default=1e-3))
-    specs.addSub(InputData.parameterInputFactory("cache_size", contentType=InputTypes.FloatType,
-                                                 descr=r"""Size of the kernel cache (in MB)""", default=200.))
-    specs.addSub(InputData.parameterInputFactory("epsilon", contentType=InputTypes.FloatType,
-                                                 descr=r"""Epsilon in the epsilon-SVR model. It specifies the epsilon-tube
-                                                           within which no penalty is associated in the training loss function
-                                                           with points predicted within a distance epsilon from the actual
-                                                           value.""", default=0.1))
-    specs.addSub(InputData.parameterInputFactory("shrinking", contentType=InputTypes.BoolType,
-                                                 descr=r"""Whether to use the shrinking heuristic.""", default=True))
-    specs.addSub(InputData.parameterInputFactory("max_iter", contentType=InputTypes.IntegerType,
-                                                 descr=r"""Hard limit on iterations within solver.``-1'' for no limit""", default=-1))
-    specs.addSub(InputData.parameterInputFactory("verbose", contentType=InputTypes.BoolType,
-                                                 descr=r"""Enable verbose output. Note that this setting takes advantage
-                                                 of a per-process runtime setting in libsvm that, if enabled, may not
-                                                 work properly in a multithreaded context.""", default=False))
+    for name, contentType, descr, default in cls._paramSpecs:
+      specs.addSub(InputData.parameterInputFactory(name, contentType=contentType, descr=descr, default=default))
+    cls._cachedSpecs = specs
     return specs
 
   def _handleInput(self, paramInput):
@@ -110,9 +161,76 @@ class SVR(ScikitLearnBase):
       @ Out, None
     """
     super()._handleInput(paramInput)
-    settings, notFound = paramInput.findNodesAndExtractValues(['C', 'kernel', 'degree', 'gamma', 'coef0',
-                                                             'tol', 'cache_size', 'epsilon', 'shrinking', 'max_iter',
-                                                             'verbose'])
-    # notFound must be empty
-    assert(not notFound)
+    settings = self._extractSettings(paramInput)
+    # n_jobs is a setting of the multioutput wrapper, not of the estimator
+    self.multioutputJobs = settings.pop('n_jobs')
+    self.approx = settings.pop('approx')
+    nComponents = settings.pop('n_components')
+    # if cache_size is not provided, the libsvm kernel cache is sized on the training set (see _fitModel)
+    self.autoCacheSize = settings['cache_size'] is None
+    if self.autoCacheSize:
+      settings['cache_size'] = 200.
+    provided = set(sub.getName() for sub in paramInput.subparts)
+    if self.approx == 'none' and settings['kernel'] == 'linear' and 'approx' not in provided:
+      # the exact solver is kept (it gives different results), but the much faster alternative is suggested
+      self.raiseAMessage('ROM', self.name, 'uses the "linear" kernel: for large training sets, <approx>liblinear</approx>',
+                         'trains a LinearSVR instead, with a solver whose cost is linear with the number of samples.')
+    if self.approx == 'liblinear':
+      if settings['kernel'] != 'linear':
+        self.raiseAnError(IOError, 'The "liblinear" approx of ROM', self.name, 'requires the "linear" kernel! Got', settings['kernel'])
+      ignored = sorted(provided & {'gamma', 'degree', 'coef0', 'cache_size', 'shrinking'})
+      if ignored:
+        self.raiseAWarning('The "liblinear" approx of ROM', self.name, 'does not use the parameters', ignored, '. They are ignored!')
+      self.model = svm.LinearSVR
+      # liblinear has no "no limit" option for max_iter, its own default is kept in that case
+      keys = ['C', 'epsilon', 'tol', 'verbose'] + (['max_iter'] if settings['max_iter'] > 0 else [])
+      settings = {key: settings[key] for key in keys}
+      # the coordinates are shuffled with a fixed seed, for the reproducibility of the training
+      settings['random_state'] = 0
+    elif self.approx == 'nystroem':
+      if nComponents < 1:
+        self.raiseAnError(IOError, 'The "n_components" of ROM', self.name, 'must be a positive integer! Got', nComponents)
+      self.model = _nystroemRegressor
+      settings = {'kernel': settings['kernel'], 'gamma': settings['gamma'], 'degree': settings['degree'],
+                  'coef0': settings['coef0'], 'n_components': nComponents, 'alpha': 0.5 / settings['C']}
     self.initializeModel(settings)
+
+  def _fitModel(self, featureVals, targetVals):
+    """
+      Fit the underlying scikit-learn model
+      @ In, featureVals, {array-like, sparse matrix}, shape=[n_samples, n_features],
+        an array of input feature values
+      @ In, targetVals, array, shape = [n_samples,n_targets], an array of output target
+        associated with the corresponding points in featureVals
+      @ Out, None
+    """
+    if self.approx == 'nystroem' and self.settings['gamma'] == 'scale':
+      # the kernel approximation does not know the "scale" value of gamma, it is computed as in SVR
+      variance = np.var(featureVals)
+      gamma = 1.0 / (featureVals.shape[1] * variance) if variance != 0 else 1.0
+      self.model.set_params(**{self._estimatorParam('nystroem__gamma'): gamma})
+    elif self.approx == 'none' and self.autoCacheSize:
+      self.model.set_params(**{self._estimatorParam('cache_size'): self._kernelCacheSize(len(featureVals))})
+    super()._fitModel(featureVals, targetVals)
+
+  def _estimatorParam(self, name):
+    """
+      Get the name of a parameter of the estimator, as seen by the model (possibly wrapped for multiple targets)
+      @ In, name, str, the name of the parameter of the estimator
+      @ Out, name, str, the name of the parameter for the set_params of the model
+    """
+    return 'estimator__' + name if self.multioutputWrapper else name
+
+  def _kernelCacheSize(self, nSamples):
+    """
+      Size the libsvm kernel cache to hold the kernel matrix of the training set, so that the kernel
+      entries are not recomputed, within a quarter of the available memory (and not less than 200 MB)
+      @ In, nSamples, int, the number of training samples
+      @ Out, cacheSize, float, the size of the kernel cache in MB
+    """
+    # without psutil the available memory is unknown, the default size is kept
+    if not isLibAvail("psutil"):
+      return 200.
+    import psutil
+    cacheSize = min(nSamples**2 * 8 / 2**20, 0.25 * psutil.virtual_memory().available / 2**20)
+    return max(cacheSize, 200.)
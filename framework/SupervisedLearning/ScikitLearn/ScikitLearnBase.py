@@ -19,10 +19,11 @@
 
 """
 #Internal Modules (Lazy Importer)--------------------------------------------------------------------
-from utils.importerUtils import importModuleLazy
+from utils.importerUtils import importModuleLazy, isLibAvail
 #Internal Modules (Lazy Importer) End----------------------------------------------------------------
 
 #External Modules------------------------------------------------------------------------------------
+import os
 np = importModuleLazy("numpy")
 import ast
 #External Modules End--------------------------------------------------------------------------------
@@ -37,6 +38,7 @@ class ScikitLearnBase(SupervisedLearning):
     Base Class for Scikitlearn-based surrogate models (classifiers and regressors)
   """
   info = {'problemtype':None, 'normalize':None}
+  _paramSpecs = () # (name, type, description, default) of the parameters of the estimator, if table-driven
 
   def __init__(self):
     """
@@ -50,6 +52,7 @@ class ScikitLearnBase(SupervisedLearning):
     self.model = None # Scikitlearn estimator/model
     self.multioutputWrapper = True # If True, use MultiOutputRegressor or MultiOutputClassifier to wrap self.model else
                                    # the self.model can handle multioutput/multi-targets prediction
+    self.multioutputJobs = None # number of jobs used by the multioutput wrapper to fit the targets in parallel (None means 1)
 
   def updateSettings(self, settings):
     """
@@ -89,13 +92,33 @@ class ScikitLearnBase(SupervisedLearning):
     """
     import sklearn.multioutput
     if type == 'regression':
-      self.model = sklearn.multioutput.MultiOutputRegressor(self.model)
+      self.model = sklearn.multioutput.MultiOutputRegressor(self.model, n_jobs=self.multioutputJobs)
     elif type == 'classification':
-      self.model = sklearn.multioutput.MultiOutputClassifier(self.model)
+      self.model = sklearn.multioutput.MultiOutputClassifier(self.model, n_jobs=self.multioutputJobs)
     else:
       self.raiseAnError(IOError, 'The "type" param for function "multioutput" should be either "regression" or "classification"! but got',
                         type)
 
+  def _extractSettings(self, paramInput):
+    """
+      Extracts the values of the parameters described by the class-level _paramSpecs table
+      in a single pass over the input nodes (the parameters that are not provided get their default)
+      @ In, paramInput, ParameterInput, the already parsed input.
+      @ Out, settings, dict, dictionary of the parameter values
+    """
+    # the defaults are collected once per class (not inherited by the subclasses), then copied at each parse
+    cls = type(self)
+    defaults = cls.__dict__.get('_cachedDefaults')
+    if defaults is None:
+      defaults = {name: default for name, _, _, default in cls._paramSpecs}
+      cls._cachedDefaults = defaults
+    settings = dict(defaults)
+    for sub in paramInput.subparts:
+      name = sub.getName()
+      if name in settings:
+        settings[name] = sub.value
+    return settings
+
   def setEstimator(self, estimatorList):
     """
       Initialization method
@@ -126,7 +149,44 @@ class ScikitLearnBase(SupervisedLearning):
     else:
       # the multi-target is handled by the internal wrapper
       self.uniqueVals = None
-      self.model.fit(featureVals,targetVals)
+      if self._limitBlasThreads():
+        # one BLAS thread per fit, to avoid the oversubscription of the cores by the concurrent fits
+        from threadpoolctl import threadpool_limits
+        with threadpool_limits(limits=1, user_api='blas'):
+          self._fitModel(featureVals,targetVals)
+      else:
+        self._fitModel(featureVals,targetVals)
+
+  def _fitsInParallel(self):
+    """
+      Check if the ROM runs concurrent fits in threads of the current process (to be overloaded by the ROMs that do)
+      @ In, None
+      @ Out, fitsInParallel, bool, True if concurrent fits are run in threads
+    """
+    return False
+
+  def _limitBlasThreads(self):
+    """
+      Check if the BLAS libraries must be limited to one thread during the training, either because
+      the environment variable RAVEN_INNER_BLAS is set to 1 (e.g. RAVEN runs parallel workers) or
+      because the ROM runs concurrent fits in threads (the limit requires the threadpoolctl library)
+      @ In, None
+      @ Out, limit, bool, True if the BLAS threads must be limited
+    """
+    if os.environ.get('RAVEN_INNER_BLAS') != '1' and not self._fitsInParallel():
+      return False
+    return isLibAvail("threadpoolctl")
+
+  def _fitModel(self, featureVals, targetVals):
+    """
+      Fit the underlying scikit-learn model
+      @ In, featureVals, {array-like, sparse matrix}, shape=[n_samples, n_features],
+        an array of input feature values
+      @ In, targetVals, array, shape = [n_samples,n_targets], an array of output target
+        associated with the corresponding points in featureVals
+      @ Out, None
+    """
+    self.model.fit(featureVals,targetVals)
 
   def __confidenceLocal__(self,featureVals):
     """
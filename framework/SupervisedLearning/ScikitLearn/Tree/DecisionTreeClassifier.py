@@ -20,9 +20,11 @@
 
 """
 #Internal Modules (Lazy Importer)--------------------------------------------------------------------
+from utils.importerUtils import importModuleLazyRenamed
 #Internal Modules (Lazy Importer) End----------------------------------------------------------------
 
 #External Modules------------------------------------------------------------------------------------
+tree = importModuleLazyRenamed("tree", globals(), "sklearn.tree")
 #External Modules End--------------------------------------------------------------------------------
 
 #Internal Modules------------------------------------------------------------------------------------
@@ -30,6 +32,10 @@ from SupervisedLearning.ScikitLearn import ScikitLearnBase
 from utils import InputData, InputTypes
 #Internal Modules End--------------------------------------------------------------------------------
 
+# the enumerated types of the parameters are built once, at import
+criterionType = InputTypes.makeEnumType("criterion", "criterionType", ['gini', 'entropy'])
+splitterType = InputTypes.makeEnumType("splitter", "splitterType", ['best', 'random'])
+
 class DecisionTreeClassifier(ScikitLearnBase):
   """
     DecisionTreeClassifier
@@ -37,6 +43,78 @@ class DecisionTreeClassifier(ScikitLearnBase):
   """
   info = {'problemtype':'classification', 'normalize':True}
 
+  # name, type, description and default value of the parameters of the estimator
+  _paramSpecs = (
+    ("criterion", criterionType,
+     r"""The function to measure the quality of a split. Supported criteria are ``gini'' for the
+                                                 Gini impurity and ``entropy'' for the information gain.""", 'gini'),
+    ("splitter", splitterType,
+     r"""The strategy used to choose the split at each node. Supported strategies are ``best''
+                                                 to choose the best split and ``random'' to choose the best random split.""", 'best'),
+    ("max_depth", InputTypes.IntegerType,
+     r"""The maximum depth of the tree. If None, then nodes are expanded until all leaves are pure
+                                                 or until all leaves contain less than min_samples_split samples.""", None),
+    ("min_samples_split", InputTypes.IntegerType,
+     r"""The minimum number of samples required to split an internal node""", 2),
+    ("min_samples_leaf", InputTypes.IntegerType,
+     r"""The minimum number of samples required to be at a leaf node. A split point at any
+                                                 depth will only be considered if it leaves at least min\_samples\_leaf training samples in each
+                                                 of the left and right branches. This may have the effect of smoothing the model, especially
+                                                 in regression.""", 1),
+    ("min_weight_fraction_leaf", InputTypes.FloatType,
+     r"""The minimum weighted fraction of the sum total of weights (of all the input samples)
+                                                 required to be at a leaf node. Samples have equal weight when sample_weight is not provided.""", 0.0),
+    ("max_features", InputTypes.StringType,
+     r"""The number of features to consider when looking for the best split:
+                                                  \begin{itemize}
+                                                    \item integer: $max\_features$ features are considered at each split
+                                                    \item float in $(0, 1]$: $max\_features$ is a fraction and
+                                                      $int(max\_features * n\_features)$ features are considered at each split
+                                                    \item sqrt: $max\_features=sqrt(n\_features)$
+                                                    \item log2: $max\_features=log2(n\_features)$
+                                                    \item auto: deprecated, same as sqrt
+                                                  \end{itemize}
+                                                  If not provided, all the features are considered. Smaller values reduce
+                                                  the cost of the split search at each node, at the price of accuracy.
+                                                  \nb the search for a split does not stop until at least one valid partition of the node
+                                                  samples is found, even if it requires to effectively inspect more than max_features features.""", None),
+    ("max_leaf_nodes", InputTypes.IntegerType,
+     r"""Grow a tree with max\_leaf\_nodes in best-first fashion. Best nodes are defined as relative reduction
+                                                 in impurity. If None then unlimited number of leaf nodes.""", None),
+    ("min_impurity_decrease", InputTypes.FloatType,
+     r"""A node will be split if this split induces a decrease of the impurity greater than or equal to this value.
+                                                 The weighted impurity decrease equation is the following:
+                                                 $N\_t / N * (impurity - N\_t\_R / N\_t * right_impurity - N\_t\_L / N\_t * left\_impurity)$
+                                                 where $N$ is the total number of samples, $N\_t$ is the number of samples at the current node, $N\_t\_L$ is the number
+                                                 of samples in the left child, and $N\_t\_R$ is the number of samples in the right child.
+                                                 $N$, $N\_t$, $N\_t]\_R$ and $N\_t\_L$ all refer to the weighted sum, if sample_weight is passed.""", 0.0),
+    # new in sklearn 0.22
+    # ("ccp_alpha", InputTypes.FloatType,
+    #  r"""Complexity parameter used for Minimal Cost-Complexity Pruning. The subtree with the largest cost
+    #                                              complexity that is smaller than ccp_alpha will be chosen. By default, no pruning is performed. """, 0.0),
+    ("random_state", InputTypes.IntegerType,
+     r"""Controls the randomness of the estimator. The features are
+                                                 always randomly permuted at each split, even if splitter is set to
+                                                 "best". When max\_features < n\_features, the algorithm will select
+                                                 max_features at random at each split before finding the best split
+                                                 among them. But the best found split may vary across different runs,
+                                                 even if max\_features=n\_features. That is the case, if the improvement
+                                                 of the criterion is identical for several splits and one split has to
+                                                 be selected at random. To obtain a deterministic behaviour during
+                                                 fitting, random\_state has to be fixed to an integer.""", None),
+    ("n_jobs", InputTypes.IntegerType,
+     r"""The number of jobs to use for the computation: when multiple targets
+                                                 are requested, the model of each target is fitted in parallel. None means 1
+                                                 unless in a joblib.parallel\_backend context. -1 means using all processors.""", None),
+    ("fastFit", InputTypes.BoolType,
+     r"""If True, the defaults of the parameters that are not provided are changed to cut the training
+                                                 cost on large datasets: splitter is ``random'' (a random threshold per candidate
+                                                 feature instead of a scan of all the thresholds), max\_features is ``sqrt'' and
+                                                 max\_depth is 20. The tree is cheaper to build, at the price of accuracy.""", False),
+  )
+  # defaults of the parameters when fastFit is requested
+  _fastFitSettings = {'splitter': 'random', 'max_features': 'sqrt', 'max_depth': 20}
+
   def __init__(self):
     """
       Constructor that will appropriately initialize a supervised learning object
@@ -44,9 +122,7 @@ class DecisionTreeClassifier(ScikitLearnBase):
       @ Out, None
     """
     super().__init__()
-    import sklearn
-    import sklearn.tree
-    self.model = sklearn.tree.DecisionTreeClassifier
+    self.model = tree.DecisionTreeClassifier
 
   @classmethod
   def getInputSpecification(cls):
@@ -57,64 +133,18 @@ class DecisionTreeClassifier(ScikitLearnBase):
       @ Out, inputSpecification, InputData.ParameterInput, class to use for
         specifying input of cls.
     """
-    specs = super(DecisionTreeClassifier, cls).getInputSpecification()
+    # the specification is built once per class (not inherited by the subclasses)
+    specs = cls.__dict__.get('_cachedSpecs')
+    if specs is not None:
+      return specs
+    specs = super().getInputSpecification()
     specs.description = r"""The \xmlNode{DecisionTreeClassifier} is a classifier that is based on the
                          decision tree logic.
                          \zNormalizationPerformed{DecisionTreeClassifier}
                          """
-    specs.addSub(InputData.parameterInputFactory("criterion", contentType=InputTypes.makeEnumType("criterion", "criterionType",['gini','entropy']),
-                                                 descr=r"""The function to measure the quality of a split. Supported criteria are ``gini'' for the
-                                                 Gini impurity and ``entropy'' for the information gain.""", default='gini'))
-    specs.addSub(InputData.parameterInputFactory("splitter", contentType=InputTypes.makeEnumType("splitter", "splitterType",['best','random']),
-                                                 descr=r"""The strategy used to choose the split at each node. Supported strategies are ``best''
-                                                 to choose the best split and ``random'' to choose the best random split.""", default='best'))
-    specs.addSub(InputData.parameterInputFactory("max_depth", contentType=InputTypes.IntegerType,
-                                                 descr=r"""The maximum depth of the tree. If None, then nodes are expanded until all leaves are pure
-                                                 or until all leaves contain less than min_samples_split samples.""", default=None))
-    specs.addSub(InputData.parameterInputFactory("min_samples_split", contentType=InputTypes.IntegerType,
-                                                 descr=r"""The minimum number of samples required to split an internal node""", default=2))
-    specs.addSub(InputData.parameterInputFactory("min_samples_leaf", contentType=InputTypes.IntegerType,
-                                                 descr=r"""The minimum number of samples required to be at a leaf node. A split point at any
-                                                 depth will only be considered if it leaves at least min\_samples\_leaf training samples in each
-                                                 of the left and right branches. This may have the effect of smoothing the model, especially
-                                                 in regression.""", default=1))
-    specs.addSub(InputData.parameterInputFactory("min_weight_fraction_leaf", contentType=InputTypes.FloatType,
-                                                 descr=r"""The minimum weighted fraction of the sum total of weights (of all the input samples)
-                                                 required to be at a leaf node. Samples have equal weight when sample_weight is not provided.""", default=0.0))
-    specs.addSub(InputData.parameterInputFactory("max_features", contentType=InputTypes.makeEnumType("maxFeatures", "maxFeaturesType",['auto','sqrt','log2']),
-                                                 descr=r"""The strategy to compute the number of features to consider when looking for the best split:
-                                                  \begin{itemize}
-                                                    \item sqrt: $max\_features=sqrt(n\_features)$
-                                                    \item log2: $max\_features=log2(n\_features)$
-                                                    \item auto: automatic selection
-                                                  \end{itemize}
-                                                  \nb the search for a split does not stop until at least one valid partition of the node
-                                                  samples is found, even if it requires to effectively inspect more than max_features features.""", default=None))
-    specs.addSub(InputData.parameterInputFactory("max_leaf_nodes", contentType=InputTypes.IntegerType,
-                                                 descr=r"""Grow a tree with max\_leaf\_nodes in best-first fashion. Best nodes are defined as relative reduction
-                                                 in impurity. If None then unlimited number of leaf nodes.""", default=None))
-    specs.addSub(InputData.parameterInputFactory("min_impurity_decrease", contentType=InputTypes.FloatType,
-                                                 descr=r"""A node will be split if this split induces a decrease of the impurity greater than or equal to this value.
-                                                 The weighted impurity decrease equation is the following:
-                                                 $N\_t / N * (impurity - N\_t\_R / N\_t * right_impurity - N\_t\_L / N\_t * left\_impurity)$
-                                                 where $N$ is the total number of samples, $N\_t$ is the number of samples at the current node, $N\_t\_L$ is the number
-                                                 of samples in the left child, and $N\_t\_R$ is the number of samples in the right child.
-                                                 $N$, $N\_t$, $N\_t]\_R$ and $N\_t\_L$ all refer to the weighted sum, if sample_weight is passed.""", default=0.0))
-    # new in sklearn 0.22
-    # specs.addSub(InputData.parameterInputFactory("ccp_alpha", contentType=InputTypes.FloatType,
-    #                                              descr=r"""Complexity parameter used for Minimal Cost-Complexity Pruning. The subtree with the largest cost
-    #                                              complexity that is smaller than ccp_alpha will be chosen. By default, no pruning is performed. """, default=0.0))
-    specs.addSub(InputData.parameterInputFactory("random_state", contentType=InputTypes.IntegerType,
-                                                 descr=r"""Controls the randomness of the estimator. The features are
-                                                 always randomly permuted at each split, even if splitter is set to
-                                                 "best". When max\_features < n\_features, the algorithm will select
-                                                 max_features at random at each split before finding the best split
-                                                 among them. But the best found split may vary across different runs,
-                                                 even if max\_features=n\_features. That is the case, if the improvement
-                                                 of the criterion is identical for several splits and one split has to
-                                                 be selected at random. To obtain a deterministic behaviour during
-                                                 fitting, random\_state has to be fixed to an integer.""",
-                                                 default=None))
+    for name, contentType, descr, default in cls._paramSpecs:
+      specs.addSub(InputData.parameterInputFactory(name, contentType=contentType, descr=descr, default=default))
+    cls._cachedSpecs = specs
     return specs
 
   def _handleInput(self, paramInput):
@@ -124,10 +154,43 @@ class DecisionTreeClassifier(ScikitLearnBase):
       @ Out, None
     """
     super()._handleInput(paramInput)
-    settings, notFound = paramInput.findNodesAndExtractValues(['criterion', 'splitter', 'max_depth','min_samples_split',
-                                                               'min_samples_leaf','min_weight_fraction_leaf','max_features',
-                                                               'max_leaf_nodes','min_impurity_decrease',
-                                                               'random_state'])
-    # notFound must be empty
-    assert(not notFound)
+    settings = self._extractSettings(paramInput)
+    # n_jobs is a setting of the multioutput wrapper, not of the estimator
+    self.multioutputJobs = settings.pop('n_jobs')
+    if settings.pop('fastFit'):
+      # the fast defaults do not override the user-provided values
+      provided = set(sub.getName() for sub in paramInput.subparts)
+      for name, value in self._fastFitSettings.items():
+        if name not in provided:
+          settings[name] = value
+    if settings['max_features'] is not None:
+      settings['max_features'] = self._convertMaxFeatures(settings['max_features'])
     self.initializeModel(settings)
+
+  def _convertMaxFeatures(self, value):
+    """
+      Converts the user-provided max_features in the value expected by the estimator
+      @ In, value, str, the max_features node content
+      @ Out, maxFeatures, int, float or str, number of features, fraction of the features or strategy
+    """
+    try:
+      maxFeatures = int(value)
+      if maxFeatures < 1:
+        self.raiseAnError(IOError, 'The integer "max_features" of ROM', self.name, 'must be positive! Got', value)
+      return maxFeatures
+    except ValueError:
+      pass
+    try:
+      maxFeatures = float(value)
+      if not 0.0 < maxFeatures <= 1.0:
+        self.raiseAnError(IOError, 'The float "max_features" of ROM', self.name, 'must be in (0, 1]! Got', value)
+      return maxFeatures
+    except ValueError:
+      pass
+    maxFeatures = value.strip().lower()
+    # "auto" is "sqrt" for the classifiers, and has been removed from the recent versions of scikit-learn
+    if maxFeatures == 'auto':
+      maxFeatures = 'sqrt'
+    if maxFeatures not in ['sqrt', 'log2']:
+      self.raiseAnError(IOError, 'The "max_features" of ROM', self.name, 'must be an integer, a float, "sqrt" or "log2"! Got', value)
+    return maxFeatures
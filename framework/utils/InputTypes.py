@@ -536,6 +536,7 @@ class EnumBaseType(InputType):
     A type that allows a set list of strings
   """
   enumList = []
+  enumSet = frozenset() # same entries as enumList, for the membership checks
 
   @classmethod
   def createClass(cls, name, xmlType, enumList):
@@ -556,6 +557,7 @@ class EnumBaseType(InputType):
     cls.xmlType = xmlType
     cls.needGenerating = True
     cls.enumList = enumList
+    cls.enumSet = frozenset(enumList)
 
   @classmethod
   def convert(cls, value):
@@ -567,7 +569,7 @@ class EnumBaseType(InputType):
     # TODO is this the right place for checking?
     ## TODO need to provide the offending XML node somehow ...
     ## TODO should these by caught and handled by the parseNode?
-    if value not in cls.enumList:
+    if value not in cls.enumSet:
       raise IOError('Value "{}" unrecognized! Expected one of {}.'.format(value, cls.enumList))
     return value
 
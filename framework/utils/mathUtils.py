@@ -574,6 +574,31 @@ def computeTruncatedTotalLeastSquare(X, Y, truncationRank):
   dY = Y.dot(VV)
   return dX, dY
 
+def computeTruncationRank(s, shape, truncationRank, maxRank=None):
+  """
+    Compute the truncation rank of a Singular Value Decomposition given its singular values
+    @ In, s, numpy.ndarray, the singular values (sorted in descending order)
+    @ In, shape, tuple, the shape of the 2D matrix on which the SVD has been performed
+    @ In, truncationRank, int or float, the truncation rank:
+                                        * -1 = no truncation
+                                        *  0 = optimal rank is computed
+                                        *  >1  user-defined truncation rank
+                                        *  >0. and < 1. computed rank is the number of the biggest sv needed to reach the energy identified by truncationRank
+    @ In, maxRank, int, optional, the maximum rank (number of left-singular vectors), default is len(s)
+    @ Out, rank, int, the truncation rank
+  """
+  maxRank = len(s) if maxRank is None else maxRank
+  if truncationRank == 0:
+    omeg = lambda x: 0.56 * x**3 - 0.95 * x**2 + 1.82 * x + 1.43
+    rank = np.sum(s > np.median(s) * omeg(np.divide(*sorted(shape))))
+  elif truncationRank > 0 and truncationRank < 1:
+    rank = np.searchsorted(np.cumsum(s / s.sum()), truncationRank) + 1
+  elif truncationRank >= 1 and isinstance(truncationRank, (int, np.integer)):
+    rank = min(int(truncationRank), maxRank)
+  else:
+    rank = maxRank
+  return rank
+
 def computeTruncatedSingularValueDecomposition(X, truncationRank, full = False, conj = True):
   """
     Compute Singular Value Decomposition and truncate it till a rank = truncationRank
@@ -583,22 +608,14 @@ def computeTruncatedSingularValueDecomposition(X, truncationRank, full = False,
                                                   *  0 = optimal rank is computed
                                                   *  >1  user-defined truncation rank
                                                   *  >0. and < 1. computed rank is the number of the biggest sv needed to reach the energy identified by truncationRank
-    @ In, full, bool, optional, compute svd returning full matrices
+    @ In, full, bool, optional, return the singular values as a (square) diagonal matrix
     @ In, conj, bool, optional, compute conjugate of right-singular vectors matrix)
     @ Out, (U, s, V), tuple of numpy.ndarray, (left-singular vectors matrix, singular values, right-singular vectors matrix)
   """
-  U, s, V = np.linalg.svd(X, full_matrices=full)
+  # the thin SVD is always enough, since at most min(X.shape) singular vectors are retained
+  U, s, V = np.linalg.svd(X, full_matrices=False)
   V = V.conj().T if conj else V.T
-
-  if truncationRank is 0:
-    omeg = lambda x: 0.56 * x**3 - 0.95 * x**2 + 1.82 * x + 1.43
-    rank = np.sum(s > np.median(s) * omeg(np.divide(*sorted(X.shape))))
-  elif truncationRank > 0 and truncationRank < 1:
-    rank = np.searchsorted(np.cumsum(s / s.sum()), truncationRank) + 1
-  elif truncationRank >= 1 and isinstance(truncationRank, int):
-    rank = min(truncationRank, U.shape[1])
-  else:
-    rank = U.shape[1]
+  rank = computeTruncationRank(s, X.shape, truncationRank, U.shape[1])
   U = U[:, :rank]
   V = V[:, :rank]
   s = np.diag(s)[:rank, :rank] if full else s[:rank]
@@ -0,0 +1,299 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+  This Module performs Unit Tests for the DMDC class.
+  It can not be considered part of the active code but of the regression test system
+"""
+import xml.etree.ElementTree as ET
+import sys, os
+import pickle
+import numpy as np
+
+# find location of crow, message handler
+frameworkDir = os.path.abspath(os.path.join(*([os.path.dirname(__file__)]+[os.pardir]*4+['framework'])))
+
+sys.path.append(frameworkDir)
+
+from utils.utils import find_crow
+find_crow(frameworkDir)
+from utils.importerUtils import isLibAvail
+
+import MessageHandler
+
+# message handler
+mh = MessageHandler.MessageHandler()
+mh.initialize({'verbosity':'quiet', 'callerLength':10, 'tagLength':10})
+
+# input specs come mostly from the Models.ROM
+from Models import ROM
+
+# find location of DMDC
+from SupervisedLearning import DynamicModeDecompositionControl
+
+print('Module undergoing testing:')
+print(DynamicModeDecompositionControl)
+print('')
+
+def createElement(tag,attrib=None,text=None):
+  """
+    Method to create a dummy xml element readable by the distribution classes
+    @ In, tag, string, the node tag
+    @ In, attrib, dict, optional, the attribute of the xml node
+    @ In, text, str, optional, the dict containig what should be in the xml text
+  """
+  if attrib is None:
+    attrib = {}
+  if text is None:
+    text = ''
+  element = ET.Element(tag,attrib)
+  element.text = text
+  return element
+
+results = {"pass":0,"fail":0}
+
+def checkTrue(comment,res,update=True):
+  """
+    This method is a pass-through for consistency and updating
+    @ In, comment, string, a comment printed out if it fails
+    @ In, res, bool, the tested value
+    @ In, update, bool, optional, if False then don't update results counter
+    @ Out, res, bool, True if test
+  """
+  if update:
+    if res:
+      results["pass"] += 1
+    else:
+      print("checking bool",comment,'|',res,'is not True!')
+      results["fail"] += 1
+  return res
+
+def checkRaises(comment,errType,function,update=True,args=None,kwargs=None):
+  """
+    Checks if the expected error type is raised
+    @ In, comment, string, a comment printed out if it fails
+    @ In, errType, type, expected type of the error
+    @ In, function, method, method to run to test for failure
+    @ In, update, bool, optional, if False then don't update results counter
+    @ In, args, list, arguments to pass to function
+    @ In, kwargs, dict, keyword arguments to pass to function
+    @ Out, res, bool, True if failed as expected
+  """
+  if args is None:
+    args = []
+  if kwargs is None:
+    kwargs = {}
+  try:
+    function(*args,**kwargs)
+    res = False
+    msg = 'Function call did not error!'
+  except errType:
+    res = True
+  except Exception as e:
+    res = False
+    msg = 'Unexpected error: {}'.format(repr(e))
+  if update:
+    if res:
+      results["pass"] += 1
+    else:
+      print("checking error",comment,'|',msg)
+      results["fail"] += 1
+  return res
+
+######################################
+#            CONSTRUCTION            #
+######################################
+def createDMDCXml(extra=None):
+  """
+    Creates the XML of a DMDC with 2 actuators, 2 states, 1 output and 1 scheduling parameter
+    @ In, extra, dict, optional, additional nodes {tag: text}
+    @ Out, xml, ET.Element, the ROM node
+  """
+  xml = createElement('ROM',attrib={'name':'test', 'subType':'DMDC'})
+  xml.append(createElement('Target',text='t,x1,x2,y1'))
+  xml.append(createElement('Features',text='u1,u2,p,x1_init,x2_init'))
+  xml.append(createElement('pivotParameter',text='t'))
+  xml.append(createElement('actuators',text='u1,u2'))
+  xml.append(createElement('stateVariables',text='x1,x2'))
+  xml.append(createElement('initStateVariables',text='x1_init,x2_init'))
+  xml.append(createElement('rankSVD',text='-1'))
+  for tag, text in (extra or {}).items():
+    xml.append(createElement(tag,text=text))
+  return xml
+
+def createDMDC(extra=None):
+  """
+    Creates a DMDC from its XML
+    @ In, extra, dict, optional, additional nodes {tag: text}
+    @ Out, dmdc, DMDC, the DMDC instance
+  """
+  rom = ROM()
+  rom.messageHandler = mh
+  rom._readMoreXML(createDMDCXml(extra))
+  return rom.supervisedContainer[0]
+
+def createData(nSamples, nTs, seed=42):
+  """
+    Creates the training data of a linear system x[k+1] = A*x[k] + B*u[k], y[k] = C*x[k]
+    whose matrices depend on the scheduling parameter p
+    @ In, nSamples, int, the number of samples
+    @ In, nTs, int, the number of time steps
+    @ In, seed, int, optional, the seed of the random actuator signals
+    @ Out, featureVals, np.ndarray, shape (nSamples, nTs, 5), the features u1, u2, p, x1_init, x2_init
+    @ Out, targetVals, np.ndarray, shape (nSamples, nTs, 4), the targets t, x1, x2, y1
+  """
+  rng = np.random.RandomState(seed)
+  featureVals = np.zeros((nSamples, nTs, 5))
+  targetVals = np.zeros((nSamples, nTs, 4))
+  for smp in range(nSamples):
+    p = 0.5 + 0.4 * smp / max(nSamples - 1, 1)
+    A = np.array([[p, 0.1], [-0.1, 0.8]])
+    B = np.array([[1.0, 0.0], [0.5, 1.0]])
+    C = np.array([[1.0, -1.0]])
+    u = rng.rand(nTs, 2)
+    x = np.zeros((nTs, 2))
+    x[0] = [1.0, 2.0]
+    for k in range(nTs-1):
+      x[k+1] = A.dot(x[k]) + B.dot(u[k])
+    featureVals[smp, :, :2] = u
+    featureVals[smp, :, 2] = p
+    featureVals[smp, :, 3:] = x[0]
+    targetVals[smp, :, 0] = np.arange(nTs)
+    targetVals[smp, :, 1:3] = x
+    targetVals[smp, :, 3] = x.dot(C.T)[:, 0]
+  return featureVals, targetVals
+
+######################################
+#          SINGULAR [X1;U]           #
+######################################
+dmdc = createDMDC()
+featureVals, targetVals = createData(3, 20)
+# no singular value of the snapshot matrix [X1;U] of the second sample is kept: its R matrix is singular
+featureVals[1, :, :2] = 0.0
+targetVals[1, :, 1:] = 0.0
+checkRaises('rank-deficient snapshot matrix', RuntimeError, dmdc.__trainLocal__, args=[featureVals, targetVals])
+
+######################################
+#     SEVERAL REQUESTS, ACTUATORS    #
+######################################
+def referenceEvaluation(dmdc, featureVals):
+  """
+    Evaluates the requests one at a time (nearest sample, then step by step propagation)
+    @ In, dmdc, DMDC, the trained DMDC
+    @ In, featureVals, np.ndarray, shape (n_requests, n_timesteps, 5), the requests
+    @ Out, evalX, np.ndarray, shape (n_requests, n_timesteps, 2), the states
+    @ Out, evalY, np.ndarray, shape (n_requests, n_timesteps, 1), the outputs
+  """
+  A, B, C = dmdc._DMDC__Atilde, dmdc._DMDC__Btilde, dmdc._DMDC__Ctilde
+  center = dmdc.dmdParams['centerUXY']
+  nTs = featureVals.shape[1]
+  evalX = np.zeros((len(featureVals), nTs, 2))
+  evalY = np.zeros((len(featureVals), nTs, 1))
+  for req, feats in enumerate(featureVals):
+    smp = np.argmin(np.abs(dmdc.parameterValues[:, 0] - feats[0, 2]))
+    u = feats[:, :2] - (dmdc.actuatorVals[smp, 0] if center else 0.)
+    x = feats[0, 3:] - (dmdc.stateVals[smp, 0] if center else 0.)
+    for k in range(nTs):
+      evalX[req, k] = x + (dmdc.stateVals[smp, 0] if center else 0.)
+      evalY[req, k] = C[smp].dot(x) + (dmdc.outputVals[smp, 0] if center else 0.)
+      x = A[smp].dot(x) + B[smp].dot(u[k])
+  return evalX, evalY
+
+featureVals, targetVals = createData(3, 20)
+# the requests are close to the samples 0, 2, 0 and 1: two of them share the same sample
+requests, _ = createData(4, 20, seed=7)
+requests[:, :, 2] = np.asarray([0.52, 0.88, 0.5, 0.71])[:, np.newaxis]
+requests[:, :, 3:] = [1.5, 0.5]
+for center in ['False', 'True']:
+  dmdc = createDMDC({'subtractNormUXY': center})
+  dmdc.__trainLocal__(featureVals, targetVals)
+  evaluation = dmdc.__evaluateLocal__(requests)
+  evalX, evalY = referenceEvaluation(dmdc, requests)
+  checkTrue('several requests, subtractNormUXY={}: actuators'.format(center),
+            np.allclose(evaluation['u1'], requests[:, :, 0]) and np.allclose(evaluation['u2'], requests[:, :, 1]))
+  checkTrue('several requests, subtractNormUXY={}: states'.format(center),
+            np.allclose(evaluation['x1'], evalX[:, :, 0]) and np.allclose(evaluation['x2'], evalX[:, :, 1]))
+  checkTrue('several requests, subtractNormUXY={}: outputs'.format(center), np.allclose(evaluation['y1'], evalY[:, :, 0]))
+  checkTrue('several requests, subtractNormUXY={}: pivot'.format(center), np.allclose(evaluation['t'], np.arange(20)))
+  # a single request gives the same values of the same request among several ones
+  single = dmdc.__evaluateLocal__(requests[2:3])
+  checkTrue('single request, subtractNormUXY={}'.format(center), np.allclose(single['x1'], evalX[2, :, 0]))
+# without centering, the linear system of the training data is exactly identified
+dmdc = createDMDC()
+dmdc.__trainLocal__(featureVals, targetVals)
+evaluation = dmdc.__evaluateLocal__(featureVals[[0, 2]])
+checkTrue('exact identification of the training system', np.allclose(evaluation['x1'], targetVals[[0, 2], :, 1]) and
+                                                         np.allclose(evaluation['y1'], targetVals[[0, 2], :, 3]))
+
+######################################
+#            MATRIX DTYPE            #
+######################################
+dmdc32 = createDMDC({'matrixDtype': 'float32'})
+dmdc32.__trainLocal__(featureVals, targetVals)
+checkTrue('float32 matrices', all(mat.dtype == np.float32 for mat in (dmdc32._DMDC__Atilde, dmdc32._DMDC__Btilde, dmdc32._DMDC__Ctilde)))
+evaluation32 = dmdc32.__evaluateLocal__(featureVals[[0, 2]])
+checkTrue('float32 propagation', evaluation32['x1'].dtype == np.float32)
+checkTrue('float32 evaluation', np.allclose(evaluation32['x1'], evaluation['x1'], rtol=1e-4) and
+                                np.allclose(evaluation32['y1'], evaluation['y1'], rtol=1e-4))
+
+######################################
+#               DEVICE               #
+######################################
+dmdcCuda = createDMDC({'device': 'cuda'})
+if not isLibAvail("cupy"):
+  # without CuPy, the cuda device falls back to the cpu (with a warning) instead of failing at evaluation
+  checkTrue('cuda device without CuPy falls back to the cpu', dmdcCuda.dmdParams['device'] == 'cpu')
+dmdcCuda.__trainLocal__(featureVals, targetVals)
+evaluationCuda = dmdcCuda.__evaluateLocal__(featureVals[[0, 2]])
+checkTrue('cuda device evaluation', np.allclose(evaluationCuda['x1'], evaluation['x1']) and
+                                    np.allclose(evaluationCuda['y1'], evaluation['y1']))
+
+######################################
+#              PICKLING              #
+######################################
+dmdc = createDMDC({'subtractNormUXY': 'True'})
+dmdc.__trainLocal__(featureVals, targetVals)
+evaluation = dmdc.__evaluateLocal__(requests)
+unpickled = pickle.loads(pickle.dumps(dmdc))
+evaluationPickle = unpickled.__evaluateLocal__(requests)
+checkTrue('pickled DMDC', all(np.allclose(evaluationPickle[var], evaluation[var]) for var in evaluation))
+# state of the previous versions: snapshots stored as [n_timesteps, n_samples, n_variables] and nearest sample found by "neigh"
+state = dmdc.__getstate__()
+for name in ['KDTreeFinder', '_featIdx', '_targIdx']:
+  del state[name]
+for name in ['actuatorVals', 'stateVals', 'outputVals']:
+  state[name] = state[name].transpose(1, 0, 2)
+state['neigh'] = None
+state['timeScales'] = dict.fromkeys(['training', 'dmd'], state['timeScales']['training'])
+state['dmdParams'] = {key: val for key, val in state['dmdParams'].items() if key not in ['matrixDtype', 'device']}
+migrated = DynamicModeDecompositionControl.DMDC.__new__(DynamicModeDecompositionControl.DMDC)
+migrated.__setstate__(state)
+checkTrue('migrated state: layout', not hasattr(migrated, 'neigh') and migrated.stateVals.shape == dmdc.stateVals.shape and
+                                    migrated.timeScales['dmd'] is not migrated.timeScales['training'])
+evaluationMigrated = migrated.__evaluateLocal__(requests)
+checkTrue('migrated state: evaluation', all(np.allclose(evaluationMigrated[var], evaluation[var]) for var in evaluation))
+
+print(results)
+
+sys.exit(results["fail"])
+"""
+  <TestInfo>
+    <name>framework.DMDC</name>
+    <author>alfoa</author>
+    <created>2026-10-14</created>
+    <classesTested>SupervisedLearning.DMDC</classesTested>
+    <description>
+       This test is a Unit Test for the DMDC class.
+    </description>
+  </TestInfo>
+"""
@@ -0,0 +1,224 @@
+# Copyright 2017 Battelle Energy Alliance, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+  This Module performs Unit Tests for the scikit-learn ROMs.
+  It can not be considered part of the active code but of the regression test system
+"""
+import xml.etree.ElementTree as ET
+import sys, os
+import numpy as np
+
+# find location of crow, message handler
+frameworkDir = os.path.abspath(os.path.join(*([os.path.dirname(__file__)]+[os.pardir]*4+['framework'])))
+
+sys.path.append(frameworkDir)
+
+from utils.utils import find_crow
+find_crow(frameworkDir)
+from utils.importerUtils import isLibAvail
+
+import MessageHandler
+
+# message handler
+mh = MessageHandler.MessageHandler()
+mh.initialize({'verbosity':'quiet', 'callerLength':10, 'tagLength':10})
+
+# input specs come mostly from the Models.ROM
+from Models import ROM
+
+# find location of the scikit-learn ROMs
+from SupervisedLearning.ScikitLearn.SVM import SVR
+from SupervisedLearning.ScikitLearn.Tree import DecisionTreeClassifier
+
+print('Module undergoing testing:')
+print(SVR)
+print(DecisionTreeClassifier)
+print('')
+
+def createElement(tag,attrib=None,text=None):
+  """
+    Method to create a dummy xml element readable by the distribution classes
+    @ In, tag, string, the node tag
+    @ In, attrib, dict, optional, the attribute of the xml node
+    @ In, text, str, optional, the dict containig what should be in the xml text
+  """
+  if attrib is None:
+    attrib = {}
+  if text is None:
+    text = ''
+  element = ET.Element(tag,attrib)
+  element.text = text
+  return element
+
+results = {"pass":0,"fail":0}
+
+def checkTrue(comment,res,update=True):
+  """
+    This method is a pass-through for consistency and updating
+    @ In, comment, string, a comment printed out if it fails
+    @ In, res, bool, the tested value
+    @ In, update, bool, optional, if False then don't update results counter
+    @ Out, res, bool, True if test
+  """
+  if update:
+    if res:
+      results["pass"] += 1
+    else:
+      print("checking bool",comment,'|',res,'is not True!')
+      results["fail"] += 1
+  return res
+
+def checkRaises(comment,errType,function,update=True,args=None,kwargs=None):
+  """
+    Checks if the expected error type is raised
+    @ In, comment, string, a comment printed out if it fails
+    @ In, errType, type, expected type of the error
+    @ In, function, method, method to run to test for failure
+    @ In, update, bool, optional, if False then don't update results counter
+    @ In, args, list, arguments to pass to function
+    @ In, kwargs, dict, keyword arguments to pass to function
+    @ Out, res, bool, True if failed as expected
+  """
+  if args is None:
+    args = []
+  if kwargs is None:
+    kwargs = {}
+  try:
+    function(*args,**kwargs)
+    res = False
+    msg = 'Function call did not error!'
+  except errType:
+    res = True
+  except Exception as e:
+    res = False
+    msg = 'Unexpected error: {}'.format(repr(e))
+  if update:
+    if res:
+      results["pass"] += 1
+    else:
+      print("checking error",comment,'|',msg)
+      results["fail"] += 1
+  return res
+
+######################################
+#            CONSTRUCTION            #
+######################################
+def createROM(subType, targets, extra=None):
+  """
+    Creates a scikit-learn ROM of the features X,Y from its XML
+    @ In, subType, str, the ROM subType
+    @ In, targets, str, the targets, comma separated
+    @ In, extra, dict, optional, additional nodes {tag: text}
+    @ Out, rom, SupervisedLearning, the ROM instance
+  """
+  xml = createElement('ROM',attrib={'name':'test', 'subType':subType})
+  xml.append(createElement('Features',text='X,Y'))
+  xml.append(createElement('Target',text=targets))
+  for tag, text in (extra or {}).items():
+    xml.append(createElement(tag,text=text))
+  rom = ROM()
+  rom.messageHandler = mh
+  rom._readMoreXML(xml)
+  return rom.supervisedContainer[0]
+
+rng = np.random.RandomState(42)
+trainingSet = {'X': rng.rand(50), 'Y': rng.rand(50)}
+trainingSet['Z'] = (trainingSet['X'] - 0.5)**2 + (trainingSet['Y'] - 0.5)**2
+trainingSet['W'] = trainingSet['X'] + trainingSet['Y']
+
+######################################
+#          SVR KERNEL CACHE          #
+######################################
+svr = createROM('SVR', 'Z')
+checkTrue('SVR cache_size not provided', svr.autoCacheSize)
+# without psutil the available memory is unknown: the default size is kept, whatever the training set
+isLibAvail = SVR.isLibAvail
+SVR.isLibAvail = lambda lib: False if lib == 'psutil' else isLibAvail(lib)
+try:
+  checkTrue('SVR cache_size without psutil', svr._kernelCacheSize(50) == 200. and svr._kernelCacheSize(100000) == 200.)
+  svr.train(trainingSet)
+  checkTrue('SVR trained without psutil', svr.model.estimators_[0].cache_size == 200.)
+finally:
+  SVR.isLibAvail = isLibAvail
+if isLibAvail('psutil'):
+  checkTrue('SVR cache_size with psutil', svr._kernelCacheSize(50) == 200. and svr._kernelCacheSize(100000) >= 200.)
+svr = createROM('SVR', 'Z', {'cache_size': '100'})
+svr.train(trainingSet)
+checkTrue('SVR cache_size provided', not svr.autoCacheSize and svr.model.estimators_[0].cache_size == 100.)
+
+######################################
+#      DTC MAX FEATURES CONVERSION   #
+######################################
+dtc = createROM('DecisionTreeClassifier', 'Z')
+for value, expected in [('2', 2), ('0.5', 0.5), ('1.0', 1.0), ('sqrt', 'sqrt'), (' Log2 ', 'log2'), ('auto', 'sqrt')]:
+  converted = dtc._convertMaxFeatures(value)
+  checkTrue('DTC max_features "{}"'.format(value), converted == expected and type(converted) == type(expected))
+for value in ['0', '-3', '1.5', '0.0', 'half', '']:
+  checkRaises('DTC invalid max_features "{}"'.format(value), IOError, dtc._convertMaxFeatures, args=[value])
+# the converted value is given to the estimator
+dtc = createROM('DecisionTreeClassifier', 'Z', {'max_features': '0.5'})
+checkTrue('DTC max_features of the estimator', dtc.model.estimator.max_features == 0.5)
+checkRaises('DTC invalid max_features in the input', IOError, createROM, args=['DecisionTreeClassifier', 'Z', {'max_features': 'half'}])
+
+######################################
+#            DTC FAST FIT            #
+######################################
+estimator = createROM('DecisionTreeClassifier', 'Z', {'fastFit': 'True'}).model.estimator
+checkTrue('DTC fastFit defaults', estimator.splitter == 'random' and estimator.max_features == 'sqrt' and estimator.max_depth == 20)
+# the fast defaults do not override the provided values
+estimator = createROM('DecisionTreeClassifier', 'Z', {'fastFit': 'True', 'splitter': 'best', 'max_depth': '5'}).model.estimator
+checkTrue('DTC fastFit provided values', estimator.splitter == 'best' and estimator.max_features == 'sqrt' and estimator.max_depth == 5)
+
+######################################
+#     MULTI-TARGET PARALLEL FIT      #
+######################################
+requests = {'X': rng.rand(10), 'Y': rng.rand(10)}
+classes = dict(trainingSet)
+classes['Z'] = (trainingSet['Z'] > 0.25).astype(int)
+classes['W'] = (trainingSet['W'] > 1.0).astype(int)
+for subType, data in [('SVR', trainingSet), ('DecisionTreeClassifier', classes)]:
+  extra = {'random_state': '1'} if subType == 'DecisionTreeClassifier' else {}
+  serial = createROM(subType, 'Z,W', extra)
+  serial.train(data)
+  expected = serial.evaluate(requests)
+  parallel = createROM(subType, 'Z,W', dict(extra, n_jobs='2'))
+  checkTrue('{} multi-target n_jobs'.format(subType), parallel.model.n_jobs == 2)
+  parallel.train(data)
+  evaluation = parallel.evaluate(requests)
+  checkTrue('{} multi-target parallel fit'.format(subType), len(parallel.model.estimators_) == 2 and
+            all(np.allclose(evaluation[var], expected[var]) for var in ['Z', 'W']))
+  # the BLAS threads can be limited during the training
+  os.environ['RAVEN_INNER_BLAS'] = '1'
+  try:
+    parallel.train(data)
+  finally:
+    del os.environ['RAVEN_INNER_BLAS']
+  evaluation = parallel.evaluate(requests)
+  checkTrue('{} multi-target parallel fit, RAVEN_INNER_BLAS'.format(subType),
+            all(np.allclose(evaluation[var], expected[var]) for var in ['Z', 'W']))
+
+print(results)
+
+sys.exit(results["fail"])
+"""
+  <TestInfo>
+    <name>framework.ScikitLearn</name>
+    <author>wangc</author>
+    <created>2026-10-14</created>
+    <classesTested>SupervisedLearning.ScikitLearn</classesTested>
+    <description>
+       This test is a Unit Test for the scikit-learn ROMs.
+    </description>
+  </TestInfo>
+"""
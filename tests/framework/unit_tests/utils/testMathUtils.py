@@ -501,6 +501,17 @@ testVarGroup(groups,'symmdiff','a2,a3,b1')      # symdiff is XOR for a, d
 testVarGroup(groups,'symmrev','b1,a2,a3')       # symmrev shows order depends on how variables are put in
 
 
+### check "computeTruncationRank"
+sv = np.array([10., 5., 1., 0.5, 0.1])
+checkAnswer('computeTruncationRank no truncation', mathUtils.computeTruncationRank(sv, (5, 20), -1), 5)
+checkAnswer('computeTruncationRank user-defined rank', mathUtils.computeTruncationRank(sv, (5, 20), 2), 2)
+checkAnswer('computeTruncationRank user-defined rank above max', mathUtils.computeTruncationRank(sv, (5, 20), 8), 5)
+checkAnswer('computeTruncationRank user-defined rank with max rank', mathUtils.computeTruncationRank(sv, (5, 20), 8, 4), 4)
+checkAnswer('computeTruncationRank energy', mathUtils.computeTruncationRank(sv, (5, 20), 0.9), 2)
+checkAnswer('computeTruncationRank optimal', mathUtils.computeTruncationRank(sv, (5, 20), 0), 2)
+checkAnswer('computeTruncationRank optimal numpy integer', mathUtils.computeTruncationRank(sv, (5, 20), np.int64(0)), 2)
+checkAnswer('computeTruncationRank user-defined numpy integer rank', mathUtils.computeTruncationRank(sv, (5, 20), np.int64(2)), 2)
+
 print(results)
 
 sys.exit(results["fail"])